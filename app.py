@@ -15,18 +15,23 @@ DEPLOY FREE:
 """
 
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont
-import qrcode
+from PIL import Image
 import io
+import os
 import json
+import time
 import zipfile
 from datetime import datetime, date
-from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.pagesizes import landscape, A4
-from reportlab.lib.utils import ImageReader
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from cert_core import (FONT_MAP, METRICS, EVENTS,
+                       make_qr, event_qr_url, build_qr_sheet_pdf, build_qr_sheet_svg,
+                       build_excel_report, write_bulk_zip, profile_call,
+                       CERT_DB, new_cert_id, format_cert_id, verify_url_for,
+                       ROSTER_FIELDS, roster_headers, guess_roster_mapping, import_roster,
+                       looks_like_header,
+                       clean_name, render_variants, DELIVERY_FORMATS, HAS_WEBP,
+                       PREVIEW_WIDTH, DATA_DIR, RenderScheduler, estimate_render_bytes,
+                       RENDER_WORKERS, RENDER_MEM_MB, RENDER_MAX_QUEUE)
+from bulk_shards import SHARD_BY, job_dir_for, plan_job, run_job, merge_job
 
 # ──────────────────────────────────────────────────────────────────
 #  Page Config  (MUST be first Streamlit call)
@@ -94,40 +99,31 @@ DEFAULTS = {
     "organizer": "",
     "admin_auth": False,
     "admin_password": "admin123",
-    "registered": {"Participant": [], "Teacher": [], "Speaker": [], "Management": []},
-    "cert_log": [],
+    "log_export": None,
+    "shard_result": None,
     "qr_data": None,
     "qr_url": "",
+    "last_profile": "",
+    "qr_sheet": None,
+    "app_url": "https://your-app.streamlit.app",
+    "verify_qr": False,
+    "dl_formats": ["png", "pdf"],
+    "preview_fmt": "webp",
 }
 for k, v in DEFAULTS.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
 # ──────────────────────────────────────────────────────────────────
-#  Font Map
+#  Session helpers
 # ──────────────────────────────────────────────────────────────────
-FONT_MAP = {
-    "Regular":      ["arial.ttf",   "DejaVuSans.ttf",          "FreeSans.ttf"],
-    "Bold":         ["arialbd.ttf", "DejaVuSans-Bold.ttf",     "FreeSerifBold.ttf"],
-    "Italic":       ["ariali.ttf",  "DejaVuSans-Oblique.ttf",  "FreeSansOblique.ttf"],
-    "Bold Italic":  ["arialbi.ttf", "DejaVuSans-BoldOblique.ttf","FreeSansBoldOblique.ttf"],
-    "Times":        ["times.ttf",   "DejaVuSerif.ttf",         "FreeSerif.ttf"],
-    "Times Bold":   ["timesbd.ttf", "DejaVuSerif-Bold.ttf",    "FreeSerifBold.ttf"],
-    "Courier":      ["cour.ttf",    "DejaVuSansMono.ttf",      "FreeMono.ttf"],
-    "Courier Bold": ["courbd.ttf",  "DejaVuSansMono-Bold.ttf", "FreeMonoBold.ttf"],
-}
-
-def load_font(style: str, size: int) -> ImageFont.ImageFont:
-    for fname in FONT_MAP.get(style, FONT_MAP["Bold"]):
-        try:
-            return ImageFont.truetype(fname, size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+DEFAULT_CATS = ["Participant", "Teacher", "Speaker", "Management"]
 
-def hex_to_rgba(h: str, alpha=255):
-    h = h.lstrip("#")
-    return (int(h[0:2],16), int(h[2:4],16), int(h[4:6],16), alpha)
+def roster_counts() -> dict:
+    # Registrations live in CERT_DB (shared by all sessions), scoped by event name
+    counts = {c: 0 for c in DEFAULT_CATS}
+    counts.update(CERT_DB.category_counts(st.session_state.event_name))
+    return counts
 
 def get_cfg() -> dict:
     return {
@@ -138,6 +134,22 @@ def get_cfg() -> dict:
         "font_style":st.session_state.font_style,
     }
 
+def event_layout(event_name: str, cats_csv: str) -> dict:
+    c = get_cfg()
+    return {
+        "event": event_name,
+        "tx":    c["text_x"],
+        "ty":    c["text_y"],
+        "fs":    c["font_size"],
+        "tc":    c["text_color"],
+        "fw":    c["font_style"],
+        "cats":  [x.strip() for x in cats_csv.split(",") if x.strip()],
+        "vq":    bool(st.session_state.verify_qr),
+        "app":   st.session_state.app_url.rstrip("/"),
+        "dl":    list(st.session_state.dl_formats),
+        "pv":    st.session_state.preview_fmt,
+    }
+
 def get_event_info() -> dict:
     try:
         dt = datetime.strptime(st.session_state.event_date, "%Y-%m-%d")
@@ -154,147 +166,11 @@ def get_event_info() -> dict:
     }
 
 # ──────────────────────────────────────────────────────────────────
-#  Core Functions
+#  Render Scheduler  (one bounded queue shared by ALL sessions)
 # ──────────────────────────────────────────────────────────────────
-def generate_certificate(name: str, template_bytes: bytes, c: dict) -> bytes:
-    img = Image.open(io.BytesIO(template_bytes)).convert("RGBA")
-    w, h = img.size
-    font = load_font(c["font_style"], c["font_size"])
-    px = int(w * c["text_x"] / 100)
-    py = int(h * c["text_y"] / 100)
-    layer = Image.new("RGBA", img.size, (255,255,255,0))
-    draw  = ImageDraw.Draw(layer)
-    bbox  = draw.textbbox((0,0), name, font=font)
-    tw = bbox[2] - bbox[0]
-    th = bbox[3] - bbox[1]
-    draw.text((px - tw//2, py - th//2), name, font=font,
-              fill=hex_to_rgba(c["text_color"]))
-    final = Image.alpha_composite(img, layer).convert("RGB")
-    buf = io.BytesIO()
-    final.save(buf, format="PNG", dpi=(300,300))
-    return buf.getvalue()
-
-def png_to_pdf(png_bytes: bytes, name: str) -> bytes:
-    buf    = io.BytesIO()
-    pw, ph = landscape(A4)
-    c      = pdf_canvas.Canvas(buf, pagesize=(pw, ph))
-    img    = Image.open(io.BytesIO(png_bytes)).convert("RGB")
-    iw, ih = img.size
-    scale  = min(pw/iw, ph/ih)
-    nw, nh = iw*scale, ih*scale
-    x, y   = (pw-nw)/2, (ph-nh)/2
-    tmp = io.BytesIO()
-    img.save(tmp, format="PNG")
-    tmp.seek(0)
-    c.drawImage(ImageReader(tmp), x, y, nw, nh, mask="auto")
-    c.setFont("Helvetica-Bold", 9)
-    c.setFillColorRGB(.5,.5,.5)
-    c.drawCentredString(pw/2, 16,
-        f"{name} | {st.session_state.event_name} | "
-        f"{datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    c.save()
-    return buf.getvalue()
-
-def make_qr(url: str) -> bytes:
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10, border=4)
-    qr.add_data(url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="#0b132b", back_color="white")
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
-
-def build_excel_report(event_info: dict, log: list) -> bytes:
-    wb   = openpyxl.Workbook()
-    hfil = PatternFill("solid", fgColor="1E1B4B")
-    hfnt = Font(bold=True, color="FFFFFF", size=12)
-
-    # ── Sheet 1: Event Summary ──────────────────────────────────
-    ws1 = wb.active
-    ws1.title = "Event Summary"
-    ws1.merge_cells("A1:C1")
-    t = ws1["A1"]
-    t.value = f"🎓 {event_info.get('event_name','Event')} — Certificate Report"
-    t.font  = Font(bold=True, color="FFD159", size=15)
-    t.fill  = PatternFill("solid", fgColor="0B132B")
-    t.alignment = Alignment(horizontal="center", vertical="center")
-    ws1.row_dimensions[1].height = 36
-
-    info_rows = [
-        ("Event Name",   event_info.get("event_name","")),
-        ("Topic",        event_info.get("topic","")),
-        ("Date",         event_info.get("event_date","")),
-        ("Day",          event_info.get("day","")),
-        ("Venue",        event_info.get("venue","")),
-        ("Organizer",    event_info.get("organizer","")),
-        ("Generated At", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-        ("Total Certs",  str(len(log))),
-    ]
-    for r, (k, v) in enumerate(info_rows, 2):
-        ws1[f"A{r}"] = k;  ws1[f"A{r}"].font = Font(bold=True, color="7ECEFD")
-        ws1[f"B{r}"] = v;  ws1[f"B{r}"].font = Font(color="E0E0E0")
-        ws1[f"A{r}"].fill = hfil
-    ws1.column_dimensions["A"].width = 20
-    ws1.column_dimensions["B"].width = 45
-
-    # ── Sheet 2: Certificate Log ─────────────────────────────────
-    ws2 = wb.create_sheet("Certificate Log")
-    headers2 = ["#","Full Name","Department","Batch","Roll No","Category","Event","Date","Day","Time"]
-    for ci, h in enumerate(headers2, 1):
-        cell = ws2.cell(row=1, column=ci, value=h)
-        cell.font = hfnt; cell.fill = hfil
-        cell.alignment = Alignment(horizontal="center")
-    for ri, rec in enumerate(log, 2):
-        row_data = [
-            ri-1,
-            rec.get("name",""),
-            rec.get("department",""),
-            rec.get("batch",""),
-            rec.get("roll_no",""),
-            rec.get("category",""),
-            rec.get("event",""),
-            rec.get("date",""),
-            rec.get("day",""),
-            rec.get("time",""),
-        ]
-        for ci, val in enumerate(row_data, 1):
-            c2 = ws2.cell(row=ri, column=ci, value=val)
-            c2.font = Font(color="E0E0E0")
-            c2.fill = PatternFill("solid", fgColor="0F1B35" if ri%2==0 else "1E1B4B")
-            c2.alignment = Alignment(horizontal="center" if ci==1 else "left")
-    for ci, w in enumerate([5,28,22,16,14,15,30,13,12,10], 1):
-        ws2.column_dimensions[get_column_letter(ci)].width = w
-
-    # ── Sheet 3: Category Summary ────────────────────────────────
-    ws3 = wb.create_sheet("Category Summary")
-    for ci, h in enumerate(["Category","Count","Names"], 1):
-        cell = ws3.cell(row=1, column=ci, value=h)
-        cell.font = hfnt; cell.fill = hfil
-    categories: dict = {}
-    for rec in log:
-        cat = rec.get("category", "Other")
-        categories.setdefault(cat, []).append(rec["name"])
-    for ri, (cat, names) in enumerate(categories.items(), 2):
-        ws3[f"A{ri}"] = cat;           ws3[f"A{ri}"].font = Font(bold=True, color="FFD159")
-        ws3[f"B{ri}"] = len(names);    ws3[f"B{ri}"].font = Font(color="E0E0E0")
-        # Build detailed name list with roll no
-        detail_list = []
-        for rec in log:
-            if rec.get("category","") == cat:
-                detail_list.append(f"{rec['name']} ({rec.get('roll_no','')})")
-        display = ", ".join(detail_list) if detail_list else ", ".join(names)
-        ws3[f"C{ri}"] = display; ws3[f"C{ri}"].font = Font(color="E0E0E0")
-        for col in "ABC":
-            ws3[f"{col}{ri}"].fill = hfil
-    for col, w in [("A",20),("B",10),("C",70)]:
-        ws3.column_dimensions[col].width = w
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
+@st.cache_resource
+def get_render_scheduler() -> RenderScheduler:
+    return RenderScheduler(RENDER_WORKERS, RENDER_MEM_MB, RENDER_MAX_QUEUE)
 
 # ══════════════════════════════════════════════════════════════════
 #  ROUTING
@@ -302,18 +178,75 @@ def build_excel_report(event_info: dict, log: list) -> bytes:
 qp   = st.query_params
 page = qp.get("page", "admin")
 
+# ══════════════════════════════════════════════════════════════════
+#  VERIFY PAGE — public, looks a certificate up by its ID
+# ══════════════════════════════════════════════════════════════════
+if page == "verify":
+    st.markdown("""
+    <div style="text-align:center;padding:30px 0 10px;">
+      <h1 style="color:#ffd159;font-size:2.2rem;">🔏 Certificate Verification</h1>
+      <p style="color:#7ecefd;font-size:1.1rem;">QR Certificate System</p>
+    </div>
+    """, unsafe_allow_html=True)
+    st.markdown("---")
+
+    _, col, _ = st.columns([1,2,1])
+    with col:
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        vid = st.text_input("🔢 Certificate ID", value=format_cert_id(qp.get("id", "")),
+                            placeholder="e.g. K7Q2-M9XD-3F8H")
+        if vid.strip():
+            rec = CERT_DB.get(vid)
+            if rec:
+                st.success(f"✅ Asli certificate — **{rec['name']}**")
+                for label, key in [("Certificate ID","cert_id"), ("Event","event"),
+                                   ("Category","category"), ("Department","department"),
+                                   ("Batch","batch"), ("Roll No","roll_no"),
+                                   ("Issued","date")]:
+                    val = format_cert_id(rec[key]) if key == "cert_id" else rec.get(key, "")
+                    if val:
+                        st.markdown(f"**{label}:** {val}")
+            else:
+                st.error("❌ Yeh ID hamare record mein nahi hai.")
+        st.markdown('</div>', unsafe_allow_html=True)
+    st.stop()
+
 # ══════════════════════════════════════════════════════════════════
 #  STUDENT PAGE — NO LOGIN, just name input
 # ══════════════════════════════════════════════════════════════════
 if page == "cert":
-    event   = qp.get("event",  "Certificate Event").replace("%20"," ")
-    tx      = float(qp.get("tx", 50))
-    ty      = float(qp.get("ty", 60))
-    fs      = int(  qp.get("fs", 72))
-    tc      = qp.get("tc", "#1a1a1a").replace("%23","#")
-    fw      = qp.get("fw", "Bold").replace("%20"," ")
-    cats_raw= qp.get("cats","Participant,Teacher,Speaker,Management")
-    cat_opt = [c.replace("%20"," ") for c in cats_raw.split(",")]
+    tpl_bytes = st.session_state.template_bytes
+    if qp.get("e"):
+        # Compact QR: short token → layout + template stored server-side
+        ev_layout = EVENTS.get(qp.get("e"))
+        if ev_layout is None:
+            st.error("❌ Yeh QR code purana ya ghalat hai. Admin se naya QR lein.")
+            st.stop()
+        event   = ev_layout["event"]
+        tx      = float(ev_layout["tx"])
+        ty      = float(ev_layout["ty"])
+        fs      = int(  ev_layout["fs"])
+        tc      = ev_layout["tc"]
+        fw      = ev_layout["fw"]
+        cat_opt = ev_layout["cats"]
+        tpl_bytes = EVENTS.template(ev_layout.get("template_id")) or tpl_bytes
+        verify_base = ev_layout.get("app") if ev_layout.get("vq") else None
+        dl_formats  = ev_layout.get("dl", ["png","pdf"])
+        preview_fmt = ev_layout.get("pv", "webp")
+    else:
+        # Legacy long QR URLs printed before tokens existed
+        event   = qp.get("event",  "Certificate Event").replace("%20"," ")
+        tx      = float(qp.get("tx", 50))
+        ty      = float(qp.get("ty", 60))
+        fs      = int(  qp.get("fs", 72))
+        tc      = qp.get("tc", "#1a1a1a").replace("%23","#")
+        fw      = qp.get("fw", "Bold").replace("%20"," ")
+        cats_raw= qp.get("cats","Participant,Teacher,Speaker,Management")
+        cat_opt = [c.replace("%20"," ") for c in cats_raw.split(",")]
+        verify_base = None
+        dl_formats  = ["png","pdf"]
+        preview_fmt = "webp"
+    dl_formats = [f for f in dl_formats if f in DELIVERY_FORMATS and (f != "webp" or HAS_WEBP)] or ["png"]
 
     # Header
     st.markdown(f"""
@@ -324,7 +257,7 @@ if page == "cert":
     """, unsafe_allow_html=True)
     st.markdown("---")
 
-    if st.session_state.template_bytes is None:
+    if tpl_bytes is None:
         st.error("⚠️ Admin ne abhi template upload nahi kiya. Thodi der baad try karein.")
         st.stop()
 
@@ -363,21 +296,47 @@ if page == "cert":
             if missing:
                 st.error("❌ Yeh fields zaroori hain: " + ", ".join(missing))
             else:
+                c_cfg = {"text_x":tx,"text_y":ty,"font_size":fs,
+                         "text_color":tc,"font_style":fw}
+                cert_id = new_cert_id()
+                v_url   = verify_url_for(verify_base, cert_id) if verify_base else None
+                sched   = get_render_scheduler()
+                job     = sched.submit(render_variants,
+                                       name_clean, tpl_bytes, c_cfg, event,
+                                       dl_formats, preview_fmt, cert_id, v_url,
+                                       cost=estimate_render_bytes(tpl_bytes, dl_formats,
+                                                                  preview_fmt))
+                if job is None:
+                    st.error("⏳ Abhi bohat zyada requests hain. "
+                             "1 minute baad dobara try karein.")
+                    st.stop()
+
+                q_slot = st.empty()
+                try:
+                    while not job.done():
+                        pos = sched.position(job)
+                        if pos:
+                            q_slot.info(f"⏳ Queue mein aapka number: **{pos}** | "
+                                        f"Andaazan intezar: ~{sched.eta(job):.0f}s")
+                        else:
+                            q_slot.info("🎨 Aapka certificate ban raha hai...")
+                        time.sleep(0.5)
+                finally:
+                    # Reload / re-click mid-wait raises here — don't render for a closed page
+                    if not job.done():
+                        sched.cancel(job)
+                q_slot.empty()
+
                 with st.spinner("🎨 Aapka certificate ban raha hai..."):
-                    c_cfg = {"text_x":tx,"text_y":ty,"font_size":fs,
-                             "text_color":tc,"font_style":fw}
-                    png = generate_certificate(
-                        name_clean, st.session_state.template_bytes, c_cfg)
-                    pdf = png_to_pdf(png, name_clean)
+                    variants = job.result()
 
                     now = datetime.now()
-                    reg = st.session_state.registered
-                    if category not in reg:
-                        reg[category] = []
-                    if name_clean not in reg[category]:
-                        reg[category].append(name_clean)
+                    CERT_DB.register(event, category, name_clean,
+                                     department=dept_clean, batch=batch_clean,
+                                     roll_no=rollno_clean)
 
-                    st.session_state.cert_log.append({
+                    rec = {
+                        "cert_id":    cert_id,
                         "name":       name_clean,
                         "department": dept_clean,
                         "batch":      batch_clean,
@@ -387,22 +346,24 @@ if page == "cert":
                         "date":       now.strftime("%Y-%m-%d"),
                         "day":        now.strftime("%A"),
                         "time":       now.strftime("%H:%M:%S"),
-                    })
-
-                st.success(f"✅ Certificate tayar hai — **{name_clean}**!")
-                st.image(png, use_container_width=True)
-
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.download_button(
-                        "⬇️ PNG Download", png,
-                        file_name=f"Certificate_{name_clean}.png",
-                        mime="image/png", use_container_width=True)
-                with c2:
-                    st.download_button(
-                        "⬇️ PDF Download", pdf,
-                        file_name=f"Certificate_{name_clean}.pdf",
-                        mime="application/pdf", use_container_width=True)
+                    }
+                    CERT_DB.issue(rec)
+
+                st.success(f"✅ Certificate tayar hai — **{name_clean}**!  "
+                           f"ID: `{format_cert_id(cert_id)}`")
+                # Screen-sized preview only — full-resolution files are the downloads
+                st.image(variants["preview"], use_container_width=True)
+
+                dcols = st.columns(len(dl_formats))
+                for di, fmt in enumerate(dl_formats):
+                    label, mime, ext = DELIVERY_FORMATS[fmt]
+                    with dcols[di]:
+                        st.download_button(
+                            f"⬇️ {label} ({len(variants[fmt]) / 1e6:.1f} MB)",
+                            variants[fmt],
+                            file_name=f"Certificate_{name_clean}.{ext}",
+                            mime=mime, use_container_width=True,
+                            key=f"dl_{fmt}")
                 st.balloons()
 
         st.markdown('</div>', unsafe_allow_html=True)
@@ -452,6 +413,10 @@ with st.sidebar:
     st.session_state.font_style = st.selectbox(
         "Font Style", list(FONT_MAP.keys()),
         index=list(FONT_MAP.keys()).index(st.session_state.font_style))
+    st.session_state.verify_qr  = st.checkbox(
+        "🔏 Verification QR on certificates", st.session_state.verify_qr,
+        help="Har certificate par ID hamesha chapti hai; yeh QR bhi add karta hai "
+             "jo ?page=verify par le jata hai.")
     st.markdown("---")
     st.markdown("## 📋 Event Info")
     st.session_state.event_name  = st.text_input("Event Name",        st.session_state.event_name)
@@ -460,6 +425,31 @@ with st.sidebar:
     st.session_state.event_venue = st.text_input("Venue",             st.session_state.event_venue)
     st.session_state.organizer   = st.text_input("Organizer",         st.session_state.organizer)
     st.markdown("---")
+    with st.expander("📱 Student Downloads"):
+        fmt_opts = [f for f in DELIVERY_FORMATS if f != "webp" or HAS_WEBP]
+        st.session_state.dl_formats = st.multiselect(
+            "Download formats", fmt_opts,
+            default=[f for f in st.session_state.dl_formats if f in fmt_opts],
+            format_func=lambda f: DELIVERY_FORMATS[f][0]) or ["png"]
+        pv_opts = ["webp", "jpeg"] if HAS_WEBP else ["jpeg"]
+        st.session_state.preview_fmt = st.selectbox(
+            "Phone preview format", pv_opts,
+            index=pv_opts.index(st.session_state.preview_fmt)
+                  if st.session_state.preview_fmt in pv_opts else 0,
+            help=f"Preview {PREVIEW_WIDTH}px chauda hota hai — full file sirf download par.")
+        st.caption("Naya setting QR dobara generate karne par lagti hai.")
+    with st.expander("⚡ Render Queue (QR burst)"):
+        sched = get_render_scheduler()
+        rq_w  = st.number_input("Max concurrent renders", 1, 32, sched.max_workers)
+        rq_m  = st.number_input("Memory budget (MB)", 64, 8192,
+                                sched.mem_budget // (1024 * 1024), step=64)
+        rq_q  = st.number_input("Max queue length", 10, 5000, sched.max_queue, step=10)
+        if (rq_w, rq_m * 1024 * 1024, rq_q) != (
+                sched.max_workers, sched.mem_budget, sched.max_queue):
+            sched.configure(rq_w, rq_m, rq_q)
+        s = sched.stats()
+        st.caption(f"Queued: {s['queued']} | Active: {s['active']} | "
+                   f"Mem: {s['mem_mb']} MB | Avg: {s['avg_secs']}s")
     with st.expander("🔑 Change Password"):
         np_ = st.text_input("New Password", type="password", key="np_")
         if st.button("Update", key="upd_pwd") and np_:
@@ -470,11 +460,12 @@ with st.sidebar:
         st.rerun()
 
 # ── Tabs ──────────────────────────────────────────────────────────
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab_perf, tab5 = st.tabs([
     "📁 Setup & QR",
     "👁️ Preview & Edit",
     "📊 Bulk Generate",
     "📈 Analytics & Report",
+    "⏱️ Performance",
     "☁️ GitHub Deploy Guide",
 ])
 
@@ -503,17 +494,46 @@ with tab1:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("### 📄 Step 2: Names List Upload")
         names_upl = st.file_uploader(
-            "Upload .txt (one name per line)", type=["txt"])
+            "Upload .txt (one name per line) ya registrar .csv / .xlsx",
+            type=["txt","csv","xlsx"])
         cat_for_upload = st.selectbox(
-            "Kin ke liye hain yeh names?",
-            ["Participant","Teacher","Speaker","Management"])
+            "Kin ke liye hain yeh names?", DEFAULT_CATS,
+            help="CSV/XLSX mein Category column ho to woh use hoga")
         if names_upl:
-            names_raw  = names_upl.read().decode("utf-8")
-            names_list = [n.strip() for n in names_raw.splitlines() if n.strip()]
-            existing   = st.session_state.registered.get(cat_for_upload, [])
-            merged     = list(dict.fromkeys(existing + names_list))
-            st.session_state.registered[cat_for_upload] = merged
-            st.success(f"✅ {len(names_list)} names loaded → {cat_for_upload}")
+            mapping    = None
+            has_header = None
+            headers    = roster_headers(names_upl, names_upl.name)
+            if headers:
+                st.markdown("**Column mapping**")
+                has_header = st.checkbox(
+                    "Pehli row header hai (first row is a header)",
+                    value=looks_like_header(headers), key="roster_has_header",
+                    help="Uncheck karein agar pehli row mein bhi naam hai")
+                guess   = guess_roster_mapping(headers)
+                options = [None] + list(range(len(headers)))
+                mcols   = st.columns(len(ROSTER_FIELDS))
+                mapping = {}
+                for mi, field in enumerate(ROSTER_FIELDS):
+                    mapping[field] = mcols[mi].selectbox(
+                        field.replace("_", " ").title(), options,
+                        index=options.index(guess[field]),
+                        format_func=lambda i: "—" if i is None else (
+                            (headers[i] or f"Col {i+1}") if has_header
+                            else f"Col {i+1} ({headers[i]})"),
+                        key=f"map_{field}")
+            if st.button("📥 Import Names", use_container_width=True):
+                if mapping is not None and mapping["name"] is None:
+                    st.error("❌ Name column select karein.")
+                else:
+                    iprog = st.empty()
+                    total, added = import_roster(
+                        CERT_DB, st.session_state.event_name, names_upl, names_upl.name,
+                        mapping, cat_for_upload,
+                        on_progress=lambda n: iprog.caption(f"⏳ {n:,} rows read..."),
+                        has_header=has_header)
+                    iprog.empty()
+                    st.success(f"✅ {total:,} rows read → {added:,} new names added "
+                               f"({total - added:,} duplicates skipped)")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with cr:
@@ -522,7 +542,7 @@ with tab1:
 
         app_url = st.text_input(
             "Your Deployed App URL",
-            value="https://your-app.streamlit.app",
+            key="app_url",
             help="GitHub deploy ke baad URL yahan paste karein")
 
         cats_input = st.text_input(
@@ -533,16 +553,10 @@ with tab1:
             if not st.session_state.template_bytes:
                 st.warning("⚠️ Pehle template upload karein!")
             else:
-                c = get_cfg()
-                tc_enc  = c['text_color'].replace('#','%23')
-                ev_enc  = st.session_state.event_name.replace(' ','%20')
-                fw_enc  = c['font_style'].replace(' ','%20')
-                cats_enc= cats_input.replace(' ','%20')
-                url = (f"{app_url.rstrip('/')}/?page=cert"
-                       f"&event={ev_enc}"
-                       f"&tx={c['text_x']}&ty={c['text_y']}"
-                       f"&fs={c['font_size']}&tc={tc_enc}"
-                       f"&fw={fw_enc}&cats={cats_enc}")
+                token = EVENTS.save(
+                    event_layout(st.session_state.event_name, cats_input),
+                    st.session_state.template_bytes)
+                url = event_qr_url(app_url, token)
                 st.session_state.qr_url  = url
                 st.session_state.qr_data = make_qr(url)
 
@@ -555,6 +569,42 @@ with tab1:
                 file_name="event_qr.png", mime="image/png",
                 use_container_width=True)
             st.info("📌 Print karo → Event mein lagao → Students scan karein!")
+
+        with st.expander("🗂️ Batch QR Sheet (multiple events / rooms)"):
+            batch_raw = st.text_area(
+                "Ek line = ek event / room (isi template aur layout ke saath)",
+                placeholder="AI Workshop — Hall A\nAI Workshop — Hall B\nSeminar Room 3",
+                height=120, key="qr_batch")
+            bcols = st.slider("QR per row", 2, 5, 3, key="qr_batch_cols")
+            if st.button("🗂️ Build QR Sheet", use_container_width=True):
+                labels = [l.strip() for l in batch_raw.splitlines() if l.strip()]
+                if not st.session_state.template_bytes:
+                    st.warning("⚠️ Pehle template upload karein!")
+                elif not labels:
+                    st.warning("⚠️ Kam az kam ek event / room likhein.")
+                else:
+                    entries = []
+                    for lbl in labels:
+                        tok = EVENTS.save(event_layout(lbl, cats_input),
+                                          st.session_state.template_bytes)
+                        entries.append((lbl, event_qr_url(app_url, tok)))
+                    st.session_state.qr_sheet = (
+                        build_qr_sheet_pdf(entries, cols=bcols,
+                                           title=st.session_state.event_name),
+                        build_qr_sheet_svg(entries, cols=bcols).encode("utf-8"))
+                    st.success(f"✅ {len(entries)} QR codes ready")
+            if st.session_state.qr_sheet:
+                sp, ss = st.columns(2)
+                with sp:
+                    st.download_button(
+                        "⬇️ QR Sheet PDF", st.session_state.qr_sheet[0],
+                        file_name="qr_sheet.pdf", mime="application/pdf",
+                        use_container_width=True)
+                with ss:
+                    st.download_button(
+                        "⬇️ QR Sheet SVG", st.session_state.qr_sheet[1],
+                        file_name="qr_sheet.svg", mime="image/svg+xml",
+                        use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
         st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -585,9 +635,10 @@ with tab2:
             "Preview ke liye naam likhein:",
             value="Muhammad Ali Khan", key="prev_name")
 
-        png_prev = generate_certificate(
-            prev_name, st.session_state.template_bytes, get_cfg())
-        st.image(png_prev, use_container_width=True,
+        prev_v = render_variants(
+            prev_name, st.session_state.template_bytes, get_cfg(),
+            st.session_state.event_name, ("png", "pdf"), "jpeg")
+        st.image(prev_v["preview"], use_container_width=True,
                  caption=(f"Preview: {prev_name} | "
                           f"Size: {st.session_state.font_size} | "
                           f"Pos: ({st.session_state.text_x}%, {st.session_state.text_y}%) | "
@@ -597,13 +648,13 @@ with tab2:
         ca, cb = st.columns(2)
         with ca:
             st.download_button(
-                "⬇️ PNG Download", png_prev,
+                "⬇️ PNG Download", prev_v["png"],
                 file_name=f"Preview_{prev_name}.png",
                 mime="image/png", use_container_width=True)
         with cb:
             st.download_button(
                 "⬇️ PDF Download",
-                png_to_pdf(png_prev, prev_name),
+                prev_v["pdf"],
                 file_name=f"Preview_{prev_name}.pdf",
                 mime="application/pdf", use_container_width=True)
 
@@ -613,9 +664,7 @@ with tab2:
         st.markdown("### 👁️ Preview All Names (Sabke Certificates Dekho)")
         st.markdown("Scroll karke har naam ka certificate check karo — koi galti nahi rahegi!")
 
-        all_names = [(n, cat)
-                     for cat, nms in st.session_state.registered.items()
-                     for n in nms]
+        all_names = CERT_DB.roster(st.session_state.event_name, limit=30)
 
         if not all_names:
             st.info("Koi naam abhi list mein nahi hai. Tab 1 se .txt upload karein ya QR scan karwain.")
@@ -632,13 +681,14 @@ with tab2:
                 cs = st.columns(cols_per_row)
                 for ci, (nm, cat) in enumerate(row_items):
                     with cs[ci]:
-                        pv = generate_certificate(
-                            nm, st.session_state.template_bytes, get_cfg())
-                        st.image(pv, caption=f"[{cat}] {nm}",
+                        pv = render_variants(
+                            nm, st.session_state.template_bytes, get_cfg(),
+                            st.session_state.event_name, ("png",), "jpeg")
+                        st.image(pv["preview"], caption=f"[{cat}] {nm}",
                                  use_container_width=True)
                         st.download_button(
                             f"⬇️ {nm[:18]}",
-                            data=pv,
+                            data=pv["png"],
                             file_name=f"{nm}.png",
                             mime="image/png",
                             key=f"dl_{nm}_{i}_{ci}")
@@ -656,66 +706,129 @@ with tab3:
         # ── Names Editor ─────────────────────────────
         st.markdown("#### ✏️ Names Review & Edit (Category wise)")
 
-        for cat in list(st.session_state.registered.keys()):
-            n_count = len(st.session_state.registered[cat])
-            with st.expander(f"📂 {cat} — {n_count} names"):
-                raw_text = st.text_area(
-                    f"Names — ek naam per line",
-                    value="\n".join(st.session_state.registered[cat]),
-                    height=160,
-                    key=f"edit_{cat}")
-                if st.button(f"💾 Save {cat} List", key=f"save_{cat}"):
-                    updated = [n.strip() for n in raw_text.splitlines() if n.strip()]
-                    st.session_state.registered[cat] = updated
-                    st.success(f"✅ {cat} list updated — {len(updated)} names")
+        ev     = st.session_state.event_name
+        counts = roster_counts()
+        fc1, fc2, fc3 = st.columns([2,3,1])
+        ed_cat  = fc1.selectbox("📂 Category", ["All"] + list(counts),
+                                format_func=lambda c: c if c == "All" else f"{c} ({counts[c]})",
+                                key="ed_cat")
+        ed_q    = fc2.text_input("🔎 Search (naam ya roll no)", key="ed_q")
+        ed_size = fc3.selectbox("Per page", [25, 50, 100], key="ed_size")
+
+        # Only the current page is queried and sent to the browser
+        cat_filter = None if ed_cat == "All" else ed_cat
+        _, n_match = CERT_DB.search_registrations(ev, cat_filter, ed_q, 0, 0)
+        n_pages = max(1, -(-n_match // ed_size))
+        if st.session_state.get("ed_page", 1) > n_pages:
+            st.session_state.ed_page = n_pages
+        pc1, pc2 = st.columns([1,5])
+        ed_page = pc1.number_input("Page", 1, n_pages, key="ed_page")
+        pc2.caption(f"{n_match:,} names match · page {ed_page} of {n_pages}")
+        rows, _ = CERT_DB.search_registrations(
+            ev, cat_filter, ed_q, (ed_page - 1) * ed_size, ed_size)
+
+        if rows:
+            import pandas as pd
+            page_df = pd.DataFrame(rows).set_index("id")
+            page_df["delete"] = False
+            edited = st.data_editor(
+                page_df,
+                column_config={
+                    "name":       st.column_config.TextColumn("Full Name", required=True),
+                    "category":   st.column_config.SelectboxColumn(
+                                      "Category", options=list(counts), required=True),
+                    "department": "Department",
+                    "batch":      "Batch",
+                    "roll_no":    "Roll No",
+                    "delete":     st.column_config.CheckboxColumn("🗑️"),
+                },
+                use_container_width=True,
+                key=f"ed_grid_{ed_cat}_{ed_q}_{ed_page}_{ed_size}")
+
+            if st.button("💾 Save Changes", key="ed_save"):
+                to_delete = [int(i) for i in edited.index[edited["delete"]]]
+                clashes   = []
+                n_changed = 0
+                for rid, row in edited.drop(columns="delete").iterrows():
+                    if rid in to_delete:
+                        continue
+                    old = page_df.loc[rid]
+                    diff = {k: str(row[k] or "").strip() for k in CERT_DB.REG_EDITABLE
+                            if str(row[k] or "").strip() != str(old[k] or "").strip()}
+                    if diff:
+                        if CERT_DB.update_registration(int(rid), **diff):
+                            n_changed += 1
+                        else:
+                            clashes.append(row["name"])
+                n_deleted = CERT_DB.delete_registrations(to_delete) if to_delete else 0
+                if clashes:
+                    st.error("❌ Yeh naam pehle se list mein hain: " + ", ".join(clashes))
+                else:
+                    st.success(f"✅ {n_changed} updated, {n_deleted} deleted")
+                    st.rerun()
+        else:
+            st.info("Koi naam match nahi hua.")
+
+        with st.expander("➕ Add Name"):
+            ac1, ac2, ac3 = st.columns([3,2,2])
+            add_name  = ac1.text_input("Full Name", key="add_name")
+            add_cat   = ac2.selectbox("Category", list(counts), key="add_cat")
+            add_roll  = ac3.text_input("Roll No", key="add_roll")
+            if st.button("➕ Add", key="add_btn") and add_name.strip():
+                if CERT_DB.register(ev, add_cat, clean_name(add_name), roll_no=add_roll.strip()):
+                    st.success(f"✅ {add_name.strip()} → {add_cat}")
                     st.rerun()
+                else:
+                    st.warning("⚠️ Yeh naam pehle se is category mein hai.")
 
         st.markdown("---")
 
         # ── Stats ────────────────────────────────────
-        all_flat = [(n, cat)
-                    for cat, nms in st.session_state.registered.items()
-                    for n in nms]
+        n_total = sum(counts.values())
 
-        mcols = st.columns(len(st.session_state.registered)+1)
-        mcols[0].metric("Total", len(all_flat))
-        for i, (cat, nms) in enumerate(st.session_state.registered.items()):
-            mcols[i+1].metric(cat, len(nms))
+        mcols = st.columns(len(counts)+1)
+        mcols[0].metric("Total", n_total)
+        for i, (cat, n) in enumerate(counts.items()):
+            mcols[i+1].metric(cat, n)
 
         st.markdown("---")
         st.markdown("#### 🚀 Sab Generate Karo + Download Karo")
 
-        if not all_flat:
+        if not n_total:
             st.info("Koi naam nahi hai. Upar edit karein ya Tab 1 se upload karein.")
         else:
+            do_profile = st.checkbox(
+                "🔬 Profile this run (cProfile + tracemalloc)",
+                help="Sirf ek run ke liye — thoda slow hoga. Report ⏱️ Performance tab mein.")
             if st.button(
-                f"🚀 Generate All {len(all_flat)} Certificates (ZIP)",
+                f"🚀 Generate All {n_total} Certificates (ZIP)",
                 use_container_width=True):
 
+                all_flat = CERT_DB.roster_rows(st.session_state.event_name)
+
                 prog   = st.progress(0)
                 status = st.empty()
-                records= []
                 buf_zip= io.BytesIO()
 
-                with zipfile.ZipFile(buf_zip, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for i, (nm, cat) in enumerate(all_flat):
-                        status.markdown(f"⏳ **{nm}** [{cat}] ({i+1}/{len(all_flat)})")
-                        png = generate_certificate(
-                            nm, st.session_state.template_bytes, get_cfg())
-                        zf.writestr(f"{cat}/{nm}.png", png)
-                        now = datetime.now()
-                        rec = {
-                            "name":nm, "category":cat,
-                            "event":st.session_state.event_name,
-                            "date":now.strftime("%Y-%m-%d"),
-                            "time":now.strftime("%H:%M:%S")
-                        }
-                        records.append(rec)
-                        # Add to log if not already there
-                        existing_names = [r["name"] for r in st.session_state.cert_log]
-                        if nm not in existing_names:
-                            st.session_state.cert_log.append(rec)
-                        prog.progress((i+1)/len(all_flat))
+                def _on_progress(i, nm, cat):
+                    status.markdown(f"⏳ **{nm}** [{cat}] ({i+1}/{len(all_flat)})")
+                    prog.progress((i+1)/len(all_flat))
+
+                def _run_bulk():
+                    with zipfile.ZipFile(buf_zip, "w", zipfile.ZIP_DEFLATED) as zf:
+                        return write_bulk_zip(
+                            zf, all_flat, st.session_state.template_bytes,
+                            get_cfg(), st.session_state.event_name, _on_progress,
+                            verify_base=(st.session_state.app_url
+                                         if st.session_state.verify_qr else None),
+                            db=CERT_DB)
+
+                with METRICS.time("bulk.total"):
+                    if do_profile:
+                        records, st.session_state.last_profile = profile_call(_run_bulk)
+                    else:
+                        records = _run_bulk()
+                METRICS.incr("bytes_produced_total", buf_zip.tell(), kind="zip")
 
                 status.success(f"✅ {len(all_flat)} certificates ready!")
 
@@ -736,6 +849,65 @@ with tab3:
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                         use_container_width=True)
 
+            with st.expander("🧩 Sharded Run (multi-process / multi-host)"):
+                st.caption("Roster ko shards mein baant kar alag processes mein render karein; "
+                           "phir ek ZIP + Excel mein merge aur verify.")
+                sc1, sc2, sc3 = st.columns(3)
+                n_shards  = sc1.number_input("Shards", 1, 256, max(2, os.cpu_count() or 2))
+                shard_by  = sc2.selectbox("Split by", SHARD_BY,
+                                          format_func=lambda b: {"range":"Roster range",
+                                                                 "category":"Category"}[b])
+                n_workers = sc3.number_input("Workers", 1, 64, min(4, os.cpu_count() or 1))
+                job_dir   = job_dir_for(DATA_DIR, st.session_state.event_name)
+
+                if st.button("🧩 Plan + Run + Merge", use_container_width=True):
+                    job = plan_job(
+                        job_dir, get_event_info(),
+                        CERT_DB.roster_rows(st.session_state.event_name),
+                        st.session_state.template_bytes, get_cfg(),
+                        shards=int(n_shards), by=shard_by,
+                        verify_base=(st.session_state.app_url
+                                     if st.session_state.verify_qr else None),
+                        db=CERT_DB)
+                    prog, done = st.progress(0), []
+
+                    def _on_shard(k):
+                        done.append(k)
+                        prog.progress(len(done)/len(job["shards"]),
+                                      text=f"Shard {len(done)}/{len(job['shards'])}")
+
+                    with METRICS.time("bulk.total"):
+                        try:
+                            run_job(job_dir, int(n_workers), _on_shard)
+                            st.session_state.shard_result = merge_job(job_dir, db=CERT_DB)
+                        except ValueError as e:
+                            st.session_state.shard_result = None
+                            st.error(f"❌ Verification failed: {e}")
+                        except Exception as e:
+                            st.session_state.shard_result = None
+                            st.error(f"❌ Sharded run failed: {type(e).__name__}: {e}")
+                    st.caption(f"Job `{job['job_id']}` · doosre hosts se: "
+                               f"`python bulk_shards.py run {job_dir} --claim`")
+
+                res = st.session_state.shard_result
+                if res and os.path.exists(res["zip"]):
+                    rep = res["verify"]
+                    if rep["ok"]:
+                        st.success(f"✅ {rep['found']}/{rep['expected']} verified — "
+                                   "koi missing ya duplicate nahi.")
+                    else:
+                        st.error(f"❌ Missing: {len(rep['missing'])} · "
+                                 f"Duplicates: {len(rep['duplicates'])} · "
+                                 f"Bad: {len(rep['bad_members'])}")
+                    d1, d2 = st.columns(2)
+                    with open(res["zip"], "rb") as f:
+                        d1.download_button("⬇️ Merged ZIP", f, os.path.basename(res["zip"]),
+                                           "application/zip", use_container_width=True)
+                    with open(res["excel"], "rb") as f:
+                        d2.download_button("📊 Combined Excel", f, os.path.basename(res["excel"]),
+                                           "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                           use_container_width=True)
+
 
 # ════════════════════════════════════════════════════
 #  TAB 4 — Analytics & Report
@@ -743,16 +915,17 @@ with tab3:
 with tab4:
     st.markdown("### 📈 Event Analytics & Certificate Report")
 
-    reg   = st.session_state.registered
-    total = sum(len(v) for v in reg.values())
-    log   = st.session_state.cert_log
+    ev    = st.session_state.event_name
+    reg   = roster_counts()
+    total = sum(reg.values())
+    lstat = CERT_DB.log_stats(ev)
 
     # Metrics
     m_cols = st.columns(len(reg)+2)
     m_cols[0].metric("Total Registered", total)
-    m_cols[1].metric("QR Scans / Certs",  len(log))
-    for i, (cat, nms) in enumerate(reg.items()):
-        m_cols[i+2].metric(cat, len(nms))
+    m_cols[1].metric("QR Scans / Certs",  lstat["total"])
+    for i, (cat, n) in enumerate(reg.items()):
+        m_cols[i+2].metric(cat, n)
 
     st.markdown("---")
 
@@ -765,49 +938,139 @@ with tab4:
     st.markdown("---")
     st.markdown("#### 📋 Live Registration Log (QR Scan se aaye names)")
 
-    if log:
+    if lstat["total"]:
+        # Filters → SQL; only the requested page is fetched and sent
+        f1, f2, f3, f4 = st.columns([2,2,2,3])
+        blank   = lambda v: "(none)" if v == "" else v
+        lg_cat  = f1.selectbox("Category", ["All"] + sorted(lstat["by_category"]),
+                               format_func=blank, key="lg_cat")
+        lg_dept = f2.selectbox("Department", ["All"] + sorted(lstat["by_department"]),
+                               format_func=blank, key="lg_dept")
+        lg_sort = f3.selectbox("Sort", list(CERT_DB.LOG_SORTS), key="lg_sort")
+        lg_q    = f4.text_input("🔎 Naam / Roll No", key="lg_q")
+        days    = sorted(lstat["by_date"])
+        d1, d2, d3 = st.columns([2,2,1])
+        lg_from = d1.selectbox("From", days, index=0, key="lg_from")
+        lg_to   = d2.selectbox("To", days, index=len(days)-1, key="lg_to")
+        lg_size = d3.selectbox("Per page", [25, 50, 100, 250], key="lg_size")
+        lg_filters = {
+            "category":   None if lg_cat == "All" else lg_cat,
+            "department": None if lg_dept == "All" else lg_dept,
+            "date_from":  lg_from,
+            "date_to":    lg_to,
+            "query":      lg_q,
+        }
+
+        _, n_match = CERT_DB.query_log(ev, 0, 0, lg_sort, **lg_filters)
+        n_pages = max(1, -(-n_match // lg_size))
+        if st.session_state.get("lg_page", 1) > n_pages:
+            st.session_state.lg_page = n_pages
+        p1, p2 = st.columns([1,5])
+        lg_page = p1.number_input("Page", 1, n_pages, key="lg_page")
+        p2.caption(f"{n_match:,} of {lstat['total']:,} certificates · page {lg_page} of {n_pages}")
+        rows, _ = CERT_DB.query_log(ev, (lg_page - 1) * lg_size, lg_size, lg_sort, **lg_filters)
+
         # Show as formatted table with friendly column names
         import pandas as pd
-        df = pd.DataFrame(log)
+        df = pd.DataFrame(rows)
         col_rename = {
             "name":"Full Name","department":"Department","batch":"Batch",
             "roll_no":"Roll No","category":"Category","event":"Event",
-            "date":"Date","day":"Day","time":"Time"
+            "date":"Date","day":"Day","time":"Time","cert_id":"Cert ID"
         }
         df = df.rename(columns={k:v for k,v in col_rename.items() if k in df.columns})
-        st.dataframe(df, use_container_width=True)
+        st.dataframe(df, use_container_width=True, hide_index=True)
 
+        # Exports read the whole filtered log, so they only run on request
         c1, c2, c3 = st.columns(3)
         with c1:
-            excel = build_excel_report(ei, log)
-            st.download_button(
-                "📊 Full Excel Report",
-                data=excel,
-                file_name=f"{st.session_state.event_name}_Full_Report.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True)
+            if st.button("📦 Prepare Exports (filtered)", use_container_width=True):
+                log_rows = list(CERT_DB.iter_log(ev, **lg_filters))
+                st.session_state.log_export = (
+                    build_excel_report(ei, log_rows),
+                    "\n".join(f"[{r['category']}] {r['name']}" for r in log_rows).encode())
         with c2:
-            names_txt = "\n".join(
-                f"[{r['category']}] {r['name']}" for r in log)
-            st.download_button(
-                "📄 Names TXT Export",
-                data=names_txt.encode(),
-                file_name="registered_names.txt",
-                mime="text/plain",
-                use_container_width=True)
+            if st.session_state.log_export:
+                st.download_button(
+                    "📊 Full Excel Report",
+                    data=st.session_state.log_export[0],
+                    file_name=f"{ev}_Full_Report.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    use_container_width=True)
+                st.download_button(
+                    "📄 Names TXT Export",
+                    data=st.session_state.log_export[1],
+                    file_name="registered_names.txt",
+                    mime="text/plain",
+                    use_container_width=True)
         with c3:
-            if st.button("🗑️ Clear Log", use_container_width=True):
-                st.session_state.cert_log = []
+            if st.button("🗑️ Clear Log", use_container_width=True,
+                         help="Log chhup jata hai — certificate IDs verify hoti rahengi"):
+                CERT_DB.archive_log(ev)
+                st.session_state.log_export = None
                 st.rerun()
+
+        with st.expander("📅 Certificates per Day"):
+            st.bar_chart(pd.Series(lstat["by_date"], name="Certificates"))
     else:
         st.info("Abhi koi QR scan nahi hua. Students scan karein to yahan naam aayenge.")
 
     # Registered names summary per category
     st.markdown("---")
     st.markdown("#### 📂 Registered Names (Category wise)")
-    for cat, nms in reg.items():
-        if nms:
-            st.markdown(f"**{cat}** ({len(nms)}): {', '.join(nms)}")
+    st.markdown(" · ".join(f"**{cat}**: {n:,}" for cat, n in reg.items()))
+    st.caption("Poori list dekhne / edit karne ke liye 📊 Bulk Generate → Names Review & Edit.")
+
+
+# ════════════════════════════════════════════════════
+#  TAB — Performance (stage timings & counters)
+# ════════════════════════════════════════════════════
+with tab_perf:
+    st.markdown("### ⏱️ Rendering Performance")
+    st.caption("Rolling window (last 2048 samples per stage) — sab sessions ka combined data.")
+
+    ctr = METRICS.counters()
+    pc  = st.columns(4)
+    pc[0].metric("Renders",   int(ctr.get("renders_total", 0)))
+    pc[1].metric("PDFs",      int(ctr.get("pdfs_total", 0)))
+    pc[2].metric("Cache Hits", int(sum(v for k, v in ctr.items()
+                                       if k.startswith("cache_hits_total"))))
+    mb_out = sum(v for k, v in ctr.items() if k.startswith("bytes_produced_total")) / 1e6
+    pc[3].metric("MB Produced", f"{mb_out:.1f}")
+
+    rows = METRICS.snapshot()
+    if rows:
+        import pandas as pd
+        st.dataframe(pd.DataFrame(rows).set_index("stage"), use_container_width=True)
+    else:
+        st.info("Abhi koi render nahi hua. Preview ya bulk generate karein.")
+
+    with st.expander("🔢 All Counters"):
+        for k, v in ctr.items():
+            st.markdown(f"`{k}` = **{v:,.0f}**")
+
+    prom = METRICS.prometheus_text()
+    with st.expander("📡 Prometheus Text Export"):
+        st.code(prom, language=None)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button(
+            "⬇️ Download metrics.prom", data=prom.encode(),
+            file_name="metrics.prom", mime="text/plain",
+            use_container_width=True)
+    with c2:
+        if st.button("🔄 Reset Metrics", use_container_width=True):
+            METRICS.reset()
+            st.rerun()
+
+    if st.session_state.last_profile:
+        st.markdown("---")
+        st.markdown("#### 🔬 Last Bulk Profile")
+        st.code(st.session_state.last_profile, language=None)
+        st.download_button(
+            "⬇️ Download Profile Report",
+            data=st.session_state.last_profile.encode(),
+            file_name="bulk_profile.txt", mime="text/plain")
 
 
 # ════════════════════════════════════════════════════
@@ -829,16 +1092,19 @@ with tab5:
 ---
 
 ### ✅ Step 2 — Files Upload Karo
-Repository page par **"uploading an existing file"** click karo aur yeh 2 files upload karo:
+Repository page par **"uploading an existing file"** click karo aur yeh 4 files upload karo
+(app.py baaki teen ko import karta hai — koi bhi missing ho to app start par ImportError dega):
 ```
 app.py
+cert_core.py
+bulk_shards.py
 requirements.txt
 ```
 Ya PowerShell mein Git use karo:
 ```bash
 cd d:/Avalon.AI
 git init
-git add app.py requirements.txt
+git add app.py cert_core.py bulk_shards.py requirements.txt
 git commit -m "first commit"
 git branch -M main
 git remote add origin https://github.com/YOUR_USERNAME/qr-certificate-generator.git
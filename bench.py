@@ -0,0 +1,385 @@
+"""
+╔══════════════════════════════════════════════════════════════════╗
+║        QR Certificate Generator Pro v2.0 — Benchmark Suite      ║
+║        Developed By: Abdul Samad | SBBU NAWABSHAH               ║
+╚══════════════════════════════════════════════════════════════════╝
+
+Synthetic templates + mixed-script rosters, every hot path of app.py.
+Each case runs in a fresh process so peak RSS is per-case.
+
+RUN:
+    python bench.py                         # full run, saves JSON baseline
+    python bench.py --quick                 # smaller rosters / fewer iters
+    python bench.py --only render,qr        # subset of cases (name prefix)
+    python bench.py --compare bench_results/baseline.json
+"""
+
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+RESOLUTIONS = {
+    "small":  (1200, 850),
+    "a4_150": (1754, 1240),
+    "a4_300": (3508, 2480),
+}
+ROSTER_SIZES = [100, 1000, 10000]
+CATEGORIES   = ["Participant", "Teacher", "Speaker", "Management"]
+CFG = {"text_x": 50, "text_y": 60, "font_size": 72,
+       "text_color": "#1a1a1a", "font_style": "Bold"}
+
+# Latin, Urdu, Sindhi, Devanagari, Chinese — deterministic per seed
+NAME_PARTS = [
+    ["Muhammad", "Ali", "Khan", "Ayesha", "Fatima", "Bilal", "Rind", "Samad"],
+    ["محمد", "علی", "خان", "عائشہ", "فاطمہ", "بلال"],
+    ["سنڌي", "ڄاڻ", "ڀٽو", "ٻانهو", "ڏاهر"],
+    ["राहुल", "प्रिया", "शर्मा", "अमित", "सिंह"],
+    ["王", "李", "张伟", "芳", "静"],
+]
+
+# ──────────────────────────────────────────────────────────────────
+#  Synthetic data
+# ──────────────────────────────────────────────────────────────────
+def make_template(res: str) -> bytes:
+    from PIL import Image, ImageDraw
+    w, h = RESOLUTIONS[res]
+    img  = Image.new("RGB", (w, h), (250, 246, 232))
+    d    = ImageDraw.Draw(img)
+    for i in range(0, min(w, h) // 2, max(1, min(w, h) // 40)):
+        d.rectangle([i, i, w - i, h - i], outline=(30 + i % 200, 40, 90))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def make_roster(n: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        parts = NAME_PARTS[rnd.randrange(len(NAME_PARTS))]
+        name  = " ".join(rnd.choice(parts) for _ in range(rnd.randint(2, 3)))
+        out.append((f"{name} {i}", CATEGORIES[i % len(CATEGORIES)]))
+    return out
+
+def make_log(roster: list) -> list:
+    return [{"name": nm, "department": "Computer Science", "batch": "2022-2026",
+             "roll_no": f"CS-{i:05d}", "category": cat, "event": "Bench Event",
+             "date": "2025-01-01", "day": "Wednesday", "time": "10:00:00"}
+            for i, (nm, cat) in enumerate(roster)]
+
+# ──────────────────────────────────────────────────────────────────
+#  Cases  — each returns (setup_fn, op_fn(state, i)[, teardown_fn(state)])
+# ──────────────────────────────────────────────────────────────────
+def case_render(res):
+    import cert_core as cc
+    def setup():
+        return make_template(res), make_roster(64)
+    def op(state, i):
+        tpl, roster = state
+        cc.generate_certificate(roster[i % len(roster)][0], tpl, CFG)
+    return setup, op
+
+def _legacy_composite(name, img_rgba, font, c):
+    # Reference: the pre-mask path (full-size RGBA layer + alpha_composite)
+    from PIL import Image, ImageDraw
+    import cert_core as cc
+    w, h  = img_rgba.size
+    layer = Image.new("RGBA", img_rgba.size, (255, 255, 255, 0))
+    draw  = ImageDraw.Draw(layer)
+    bbox  = draw.textbbox((0, 0), name, font=font)
+    tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    px, py = int(w * c["text_x"] / 100), int(h * c["text_y"] / 100)
+    draw.text((px - tw // 2, py - th // 2), name, font=font,
+              fill=cc.hex_to_rgba(c["text_color"]))
+    return Image.alpha_composite(img_rgba, layer).convert("RGB")
+
+def case_composite(res, mode, iters):
+    # Text compositing only (template already decoded) — layer vs cached mask.
+    # layer gets its font once in setup; mask.cold uses a new name every call, so
+    # each op is a cache miss and pays the same single font open text_mask does.
+    import cert_core as cc
+    from PIL import Image
+    def setup():
+        img  = Image.open(io.BytesIO(make_template(res)))
+        font = cc.load_font(CFG["font_style"], CFG["font_size"])
+        n    = iters + 1 if mode == "mask.cold" else 8
+        roster = make_roster(n)
+        if mode == "mask.warm":
+            for nm, _ in roster:
+                cc.text_mask(nm, CFG["font_style"], CFG["font_size"])
+        return img.convert("RGBA"), img.convert("RGB"), font, roster
+    def op(state, i):
+        rgba, rgb, font, roster = state
+        name = roster[i % len(roster)][0]
+        if mode == "layer":
+            _legacy_composite(name, rgba, font, CFG)
+        else:
+            w, h = rgb.size
+            glyph = cc.text_mask(name, CFG["font_style"], CFG["font_size"])
+            cc.blend_text(rgb.copy(), glyph, CFG["text_color"],
+                          (int(w * CFG["text_x"] / 100), int(h * CFG["text_y"] / 100)))
+    return setup, op
+
+def case_pdf(res):
+    import cert_core as cc
+    def setup():
+        return cc.generate_certificate("Muhammad Ali Khan", make_template(res), CFG)
+    def op(png, i):
+        cc.png_to_pdf(png, "Muhammad Ali Khan", "Bench Event")
+    return setup, op
+
+def case_variants(res):
+    import cert_core as cc
+    def setup():
+        return make_template(res)
+    def op(tpl, i):
+        cc.render_variants("Muhammad Ali Khan", tpl, CFG, "Bench Event",
+                           ("png", "jpeg", "webp", "pdf"), "webp")
+    return setup, op
+
+def case_qr(length):
+    import cert_core as cc
+    def setup():
+        base = "https://your-app.streamlit.app/?page=cert&event="
+        return base + ("A" * length)
+    def op(url, i):
+        cc.make_qr(url + str(i))
+    return setup, op
+
+def case_excel(n):
+    import cert_core as cc
+    def setup():
+        return make_log(make_roster(n))
+    def op(log, i):
+        cc.build_excel_report({"event_name": "Bench Event"}, log)
+    return setup, op
+
+def case_roster_import(n):
+    import cert_core as cc
+    import tempfile
+    def setup():
+        rows = make_roster(n)
+        # A quarter of the rows repeat — registrar exports often do
+        rows = rows + rows[: n // 4]
+        lines = ["Full Name,Department,Batch,Roll No,Category"]
+        lines += [f'"{nm}",Computer Science,2022-2026,CS-{i:05d},{cat}'
+                  for i, (nm, cat) in enumerate(rows)]
+        return "\n".join(lines).encode("utf-8"), tempfile.mkdtemp(prefix="certbench_")
+    def op(state, i):
+        data, tmp = state
+        db  = cc.CertDB(os.path.join(tmp, f"roster_{i}.db"))
+        f   = io.BytesIO(data)
+        mapping = cc.guess_roster_mapping(cc.roster_headers(f, "roster.csv"))
+        cc.import_roster(db, "Bench Event", f, "roster.csv", mapping)
+    def teardown(state):
+        shutil.rmtree(state[1], ignore_errors=True)
+    return setup, op, teardown
+
+def case_bulk_zip(n, verify_qr):
+    # The Tab 3 path: cert IDs issued to a DB (fresh per op, so none are reused),
+    # optionally with a verify QR stamped on every certificate
+    import cert_core as cc
+    import tempfile
+    def setup():
+        rows = [{"name": nm, "category": cat, "department": "Computer Science",
+                 "batch": "2022-2026", "roll_no": f"CS-{i:05d}"}
+                for i, (nm, cat) in enumerate(make_roster(n))]
+        return make_template("small"), rows, tempfile.mkdtemp(prefix="certbench_")
+    def op(state, i):
+        tpl, roster, tmp = state
+        db  = cc.CertDB(os.path.join(tmp, f"bulk_{i}.db"))
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            cc.write_bulk_zip(zf, roster, tpl, CFG, "Bench Event",
+                              verify_base="https://your-app.streamlit.app" if verify_qr else None,
+                              db=db)
+    def teardown(state):
+        shutil.rmtree(state[2], ignore_errors=True)
+    return setup, op, teardown
+
+def case_burst(n, mode):
+    # n students scan at once: bounded scheduler vs one thread per request.
+    # Samples are per-request latencies (submit → done), so p99 is what the last student waits.
+    import threading
+    import cert_core as cc
+    def setup():
+        tpl   = make_template("a4_150")
+        sched = (cc.RenderScheduler(cc.RENDER_WORKERS, cc.RENDER_MEM_MB, n)
+                 if mode == "sched" else None)
+        return tpl, make_roster(n), sched
+    def op(state, i):
+        tpl, roster, sched = state
+        lat, lock = [], threading.Lock()
+        def render(nm, t0):
+            cc.render_variants(nm, tpl, CFG, "Bench Event", ("png", "pdf"), "webp")
+            with lock:
+                lat.append(time.perf_counter() - t0)
+        if sched is not None:
+            cost = cc.estimate_render_bytes(tpl, ("png", "pdf"), "webp")
+            jobs = [sched.submit(render, nm, time.perf_counter(), cost=cost)
+                    for nm, _ in roster]
+            for job in jobs:
+                job.result()
+        else:
+            threads = [threading.Thread(target=render, args=(nm, time.perf_counter()))
+                       for nm, _ in roster]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        return lat
+    return setup, op
+
+def build_cases(quick: bool) -> list:
+    rosters = ROSTER_SIZES[:2] if quick else ROSTER_SIZES
+    iters   = 5 if quick else 20
+    cases   = []
+    for res in RESOLUTIONS:
+        cases.append((f"render.{res}",  case_render, (res,), iters, 1))
+        cases.append((f"pdf.{res}",     case_pdf,    (res,), iters, 1))
+        cases.append((f"variants.{res}", case_variants, (res,), iters, 1))
+        for mode in ("layer", "mask.warm", "mask.cold"):
+            cases.append((f"composite.{mode}.{res}", case_composite, (res, mode, iters), iters, 1))
+    for ln in (16, 128, 512):
+        cases.append((f"qr.len{ln}",    case_qr,     (ln,),  iters * 2, 1))
+    for n in rosters:
+        cases.append((f"excel.n{n}",    case_excel,  (n,),   3 if n >= 10000 else iters // 2, n))
+        cases.append((f"roster_import.n{n}", case_roster_import, (n,), 3 if n >= 10000 else iters // 2, n))
+    for n in ([16] if quick else [16, 64]):
+        cases.append((f"burst.sched.n{n}",     case_burst, (n, "sched"),     2, n))
+        cases.append((f"burst.unbounded.n{n}", case_burst, (n, "unbounded"), 2, n))
+    # Full-render bulk scales linearly, so 10k is skipped — 100/1k are enough to trend
+    for n in ([100] if quick else [100, 1000]):
+        cases.append((f"bulk_zip.n{n}",    case_bulk_zip, (n, False), 1 if n >= 1000 else 3, n))
+        cases.append((f"bulk_zip.vqr.n{n}", case_bulk_zip, (n, True),  1 if n >= 1000 else 3, n))
+    return cases
+
+# ──────────────────────────────────────────────────────────────────
+#  Runner
+# ──────────────────────────────────────────────────────────────────
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentile(sorted_vals: list, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+def _run_case(factory, args, iters, items, q):
+    try:
+        setup, op, *teardown = factory(*args)
+        state = setup()
+        op(state, 0)                               # warm-up (font load, imports)
+        times, total = [], 0.0
+        for i in range(iters):
+            t0 = time.perf_counter()
+            samples = op(state, i + 1)
+            dt = time.perf_counter() - t0
+            total += dt
+            # Burst cases return per-request latencies instead of one timing per call
+            times.extend(samples if isinstance(samples, list) else [dt])
+        times.sort()
+        for td in teardown:
+            td(state)
+        q.put({
+            "iters":      iters,
+            "p50_ms":     round(percentile(times, 50) * 1000, 3),
+            "p90_ms":     round(percentile(times, 90) * 1000, 3),
+            "p99_ms":     round(percentile(times, 99) * 1000, 3),
+            "mean_ms":    round(sum(times) / len(times) * 1000, 3),
+            "items_per_s": round(iters * items / total, 2) if total else None,
+            "peak_rss_mb": peak_rss_mb(),
+        })
+    except Exception as e:
+        q.put({"error": f"{type(e).__name__}: {e}"})
+
+def run_all(cases: list, only: list) -> dict:
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name, factory, args, iters, items in cases:
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        q = ctx.Queue()
+        p = ctx.Process(target=_run_case, args=(factory, args, iters, items, q))
+        p.start()
+        res = q.get()
+        p.join()
+        results[name] = res
+        if "error" in res:
+            print(f"  {name:<24} ERROR {res['error']}")
+        else:
+            print(f"  {name:<24} p50={res['p50_ms']:>10.2f}ms  p99={res['p99_ms']:>10.2f}ms"
+                  f"  {res['items_per_s']:>10}/s  rss={res['peak_rss_mb']}MB")
+    return results
+
+def compare(results: dict, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    regressions = 0
+    print(f"\nCompare vs {baseline_path}  (threshold {threshold:.0%})")
+    for name, res in results.items():
+        old = base.get(name)
+        if not old or "error" in old or "error" in res:
+            continue
+        ratio = res["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 1.0
+        flag  = ""
+        if ratio > 1 + threshold:
+            flag = "  ← REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  ← faster"
+        print(f"  {name:<24} {old['p50_ms']:>10.2f} → {res['p50_ms']:>10.2f} ms"
+              f"  ({ratio:.2f}x){flag}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark certificate hot paths")
+    ap.add_argument("--quick", action="store_true", help="smaller rosters, fewer iterations")
+    ap.add_argument("--only", default="", help="comma separated case-name prefixes")
+    ap.add_argument("--out", default="", help="JSON output path (default bench_results/<ts>.json)")
+    ap.add_argument("--compare", default="", help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="p50 regression threshold")
+    a = ap.parse_args()
+
+    only = [o.strip() for o in a.only.split(",") if o.strip()]
+    print(f"Benchmark — python {platform.python_version()} on {platform.platform()}")
+    results = run_all(build_cases(a.quick), only)
+
+    out = a.out or os.path.join(
+        "bench_results", datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created":  datetime.now().isoformat(timespec="seconds"),
+            "python":   platform.python_version(),
+            "platform": platform.platform(),
+            "cpus":     os.cpu_count(),
+            "quick":    a.quick,
+            "results":  results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved → {out}")
+
+    if a.compare:
+        sys.exit(1 if compare(results, a.compare, a.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
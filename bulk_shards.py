@@ -0,0 +1,481 @@
+"""
+╔══════════════════════════════════════════════════════════════════╗
+║        QR Certificate Generator Pro v2.0 — Sharded Bulk Jobs    ║
+║        Developed By: Abdul Samad | SBBU NAWABSHAH               ║
+╚══════════════════════════════════════════════════════════════════╝
+
+Splits one bulk run into deterministic shards that any number of worker
+processes — or hosts sharing the job directory — render independently.
+
+JOB DIRECTORY:
+    job.json                     plan: event, layout, shard → roster indices
+    template.bin                 certificate template
+    roster.jsonl                 frozen roster snapshot (one attendee per line)
+    shards/shard_0003.zip        partial archive, {cat}/{name}.png
+    shards/shard_0003.json       manifest: idx, path, cert_id, crc, size
+    <event>_Certificates.zip     merged archive
+    <event>_Report.xlsx          combined Excel report
+
+RUN:
+    python bulk_shards.py plan  JOB --token ABCD1234 --shards 8        # from a QR token
+    python bulk_shards.py run   JOB --workers 4                         # local process pool
+    python bulk_shards.py run   JOB --claim                             # one worker per host
+    python bulk_shards.py merge JOB --issue                             # ZIP + Excel + DB
+    python bulk_shards.py verify JOB
+    python bulk_shards.py run   JOB --shard 3                           # redo one shard by hand
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from cert_core import (METRICS, EVENTS, CERT_DB, atomic_write, generate_certificate,
+                       build_excel_report, new_cert_id, verify_url_for, archive_path,
+                       find_issued)
+
+SHARD_BY = ("range", "category")
+
+# ──────────────────────────────────────────────────────────────────
+#  Plan
+# ──────────────────────────────────────────────────────────────────
+def _json_bytes(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, indent=1).encode("utf-8")
+
+def _read_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def split_shards(roster: list, shards: int, by: str = "range") -> list:
+    """Roster indices per shard — a pure function of roster order, so every host agrees.
+
+    "range" cuts the roster into `shards` contiguous, near-equal slices;
+    "category" gives each category its own shard(s), ranges split further
+    when a category is larger than an even share.
+    """
+    if by not in SHARD_BY:
+        raise ValueError(f"shard by must be one of {SHARD_BY}")
+    n      = len(roster)
+    shards = max(1, min(shards, n or 1))
+    if by == "range":
+        step, extra = divmod(n, shards)
+        out, lo = [], 0
+        for k in range(shards):
+            hi = lo + step + (1 if k < extra else 0)
+            out.append(list(range(lo, hi)))
+            lo = hi
+        return out
+    groups: dict = {}
+    for i, r in enumerate(roster):
+        groups.setdefault(r["category"], []).append(i)
+    share = -(-n // shards) if n else 1
+    out = []
+    for cat in sorted(groups):
+        idx = groups[cat]
+        for lo in range(0, len(idx), share):
+            out.append(idx[lo:lo + share])
+    return out
+
+def job_dir_for(root: str, event: str) -> str:
+    """Readable per-event job dir; the hash keeps "AI Workshop" and "AI_Workshop" apart."""
+    safe = "".join(ch if ch.isalnum() else "_" for ch in event)[:60]
+    return os.path.join(root, "jobs", f"{safe}_{hashlib.sha256(event.encode('utf-8')).hexdigest()[:8]}")
+
+def _roster_bytes(roster: list) -> bytes:
+    return b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in roster)
+
+def plan_job(job_dir: str, event_info: dict, roster: list, template_bytes: bytes,
+             c: dict, shards: int = 4, by: str = "range", verify_base: str = None,
+             db=None) -> dict:
+    """Freeze roster + layout + cert IDs into job_dir and write the shard plan (job.json).
+
+    Attendees already in the db's log keep their cert ID; everyone else gets
+    one here, so re-running a shard always embeds the same IDs. Planning the
+    same inputs again reuses the existing job (shards, "issued"), refreshing
+    only event_info — it feeds the Excel summary, not the rendered images.
+    """
+    event  = event_info.get("event_name", "")
+    issued = db.issued_ids(event) if db is not None else {}
+    seen   = set()
+    roster = [{"name": r["name"], "category": r["category"],
+               "department": r.get("department") or "", "batch": r.get("batch") or "",
+               "roll_no": r.get("roll_no") or "",
+               "path": archive_path(r["category"], r["name"], r.get("roll_no") or "", seen),
+               "cert_id": find_issued(issued, r["category"], r["name"], r.get("roll_no"))}
+              for r in roster]
+    parts  = split_shards(roster, shards, by)
+    digest = hashlib.sha256()
+    # job_id covers the inputs, not the cert IDs — those change once a merge issues them
+    for chunk in (_roster_bytes([dict(r, cert_id="") for r in roster]), template_bytes,
+                  _json_bytes(c), f"{by}|{len(parts)}|{verify_base or ''}".encode()):
+        digest.update(hashlib.sha256(chunk).digest())
+    job_id = digest.hexdigest()[:16]
+    try:
+        old, old_roster = load_job(job_dir)
+    except (OSError, ValueError, KeyError):
+        old = None
+    if old and old.get("job_id") == job_id and all(
+            not r["cert_id"] or r["cert_id"] == o.get("cert_id")
+            for r, o in zip(roster, old_roster)):
+        if old.get("event_info") != event_info:
+            old["event_info"] = event_info
+            atomic_write(os.path.join(job_dir, "job.json"), _json_bytes(old))
+        return old
+
+    for r in roster:
+        r["cert_id"] = r["cert_id"] or new_cert_id()
+    roster_raw = _roster_bytes(roster)
+    job = {
+        "job_id":      job_id,
+        "created":     datetime.now().isoformat(timespec="seconds"),
+        "event":       event,
+        "event_info":  event_info,
+        "cfg":         c,
+        "verify_base": verify_base,
+        "by":          by,
+        "total":       len(roster),
+        "roster_sha256":   hashlib.sha256(roster_raw).hexdigest(),
+        "template_sha256": hashlib.sha256(template_bytes).hexdigest(),
+        "shards":      [{"shard": k, "indices": idx} for k, idx in enumerate(parts)],
+    }
+    os.makedirs(os.path.join(job_dir, "shards"), exist_ok=True)
+    atomic_write(os.path.join(job_dir, "template.bin"), template_bytes)
+    atomic_write(os.path.join(job_dir, "roster.jsonl"), roster_raw)
+    atomic_write(os.path.join(job_dir, "job.json"), _json_bytes(job))
+    return job
+
+def plan_from_token(job_dir: str, token: str, db=CERT_DB, **kw) -> dict:
+    """Plan from a saved QR layout: template + text settings from EVENTS, roster from the DB."""
+    lay = EVENTS.get(token)
+    if lay is None:
+        raise ValueError(f"unknown event token {token!r}")
+    tpl = EVENTS.template(lay.get("template_id"))
+    if not tpl:
+        raise ValueError(f"event token {token!r} has no stored template")
+    c = {"text_x": float(lay["tx"]), "text_y": float(lay["ty"]),
+         "font_size": int(lay["fs"]), "text_color": lay["tc"], "font_style": lay["fw"]}
+    kw.setdefault("verify_base", lay.get("app") if lay.get("vq") else None)
+    return plan_job(job_dir, {"event_name": lay["event"]}, db.roster_rows(lay["event"]),
+                    tpl, c, db=db, **kw)
+
+# ──────────────────────────────────────────────────────────────────
+#  Run (one shard = one process; safe to re-run, output is replaced atomically)
+# ──────────────────────────────────────────────────────────────────
+def _shard_path(job_dir: str, k: int, ext: str) -> str:
+    return os.path.join(job_dir, "shards", f"shard_{k:04d}.{ext}")
+
+def load_job(job_dir: str) -> tuple:
+    job = _read_json(os.path.join(job_dir, "job.json"))
+    with open(os.path.join(job_dir, "roster.jsonl"), "rb") as f:
+        raw = f.read()
+    if hashlib.sha256(raw).hexdigest() != job["roster_sha256"]:
+        raise ValueError("roster.jsonl does not match job.json — re-plan the job")
+    roster = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    return job, roster
+
+def shard_done(job_dir: str, job: dict, k: int) -> bool:
+    try:
+        m = _read_json(_shard_path(job_dir, k, "json"))
+    except (OSError, ValueError):
+        return False
+    return m.get("job_id") == job["job_id"] and os.path.exists(_shard_path(job_dir, k, "zip"))
+
+def run_shard(job_dir: str, k: int) -> dict:
+    """Render shard k into shards/shard_k.zip and write its manifest last."""
+    job, roster = load_job(job_dir)
+    with open(os.path.join(job_dir, "template.bin"), "rb") as f:
+        tpl = f.read()
+    c, vbase = job["cfg"], job.get("verify_base")
+    zpath    = _shard_path(job_dir, k, "zip")
+    tmp      = f"{zpath}.tmp{os.getpid()}"
+    os.makedirs(os.path.dirname(zpath), exist_ok=True)
+
+    t0, entries = time.perf_counter(), []
+    # PNGs are already deflated; STORED keeps the merge a plain byte copy
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:
+        for i in job["shards"][k]["indices"]:
+            r       = roster[i]
+            cert_id = r["cert_id"]
+            vurl    = verify_url_for(vbase, cert_id) if vbase else None
+            with METRICS.time("bulk.item"):
+                png = generate_certificate(r["name"], tpl, c, cert_id, vurl)
+            path = r["path"]
+            zf.writestr(path, png)
+            info = zf.getinfo(path)
+            now  = datetime.now()
+            entries.append({
+                "idx": i, "path": path, "cert_id": cert_id,
+                "crc": info.CRC, "size": info.file_size,
+                "date": now.strftime("%Y-%m-%d"), "day": now.strftime("%A"),
+                "time": now.strftime("%H:%M:%S"),
+            })
+    os.replace(tmp, zpath)
+    manifest = {
+        "job_id":   job["job_id"],
+        "shard":    k,
+        "host":     HOST,
+        "pid":      os.getpid(),
+        "seconds":  round(time.perf_counter() - t0, 3),
+        "entries":  entries,
+    }
+    atomic_write(_shard_path(job_dir, k, "json"), _json_bytes(manifest))
+    return manifest
+
+LOCK_STALE_SECS = 2 * 3600
+HOST = os.uname().nodename if hasattr(os, "uname") else os.environ.get("COMPUTERNAME", "")
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def _read_lock_file(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        # Torn or pre-JSON lock: unknown owner, age 0 → stale on every host
+        return {"host": "?", "pid": 0, "time": 0}
+
+def read_lock(job_dir: str, k: int):
+    """{host, pid, time} of the worker holding shard k, or None when unlocked."""
+    return _read_lock_file(_shard_path(job_dir, k, "lock"))
+
+def lock_is_stale(lock: dict, stale_after: float = LOCK_STALE_SECS) -> bool:
+    # Same host: the pid tells us for sure. Other hosts: only age can.
+    if lock.get("host") == HOST and lock.get("pid"):
+        return not _pid_alive(lock["pid"])
+    return time.time() - float(lock.get("time") or 0) > stale_after
+
+def _claim(job_dir: str, k: int, stale_after: float = LOCK_STALE_SECS) -> bool:
+    # O_EXCL create is atomic on local disks and NFSv3+ — first host wins the shard
+    lock = _shard_path(job_dir, k, "lock")
+    os.makedirs(os.path.dirname(lock), exist_ok=True)
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        held = read_lock(job_dir, k)
+        if held is None or not lock_is_stale(held, stale_after):
+            return held is None and _claim(job_dir, k, stale_after)
+        # Take over a dead worker's lock: rename is atomic, so only one taker wins
+        grave = f"{lock}.stale{os.getpid()}"
+        try:
+            os.rename(lock, grave)
+        except FileNotFoundError:
+            return False
+        if _read_lock_file(grave) != held:
+            # Someone re-locked between our read and rename — hand it back
+            os.replace(grave, lock)
+            return False
+        os.remove(grave)
+        return _claim(job_dir, k, stale_after)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"host": HOST, "pid": os.getpid(), "time": time.time()}, f)
+    return True
+
+def run_claimed(job_dir: str, on_done=None, stale_after: float = LOCK_STALE_SECS) -> list:
+    """Worker loop for multi-host runs: claim → render → release, until no shard is left.
+
+    A lock left by a killed worker is taken over once its pid is gone (same
+    host) or it is older than stale_after seconds (other hosts).
+    """
+    job, _ = load_job(job_dir)
+    done   = []
+    for s in job["shards"]:
+        k = s["shard"]
+        if shard_done(job_dir, job, k) or not _claim(job_dir, k, stale_after):
+            continue
+        try:
+            run_shard(job_dir, k)
+            done.append(k)
+            if on_done:
+                on_done(k)
+        finally:
+            os.remove(_shard_path(job_dir, k, "lock"))
+    return done
+
+def run_job(job_dir: str, workers: int = None, on_done=None, force: bool = False) -> list:
+    """Render every pending shard in a local process pool; returns the shard numbers run."""
+    job, _  = load_job(job_dir)
+    pending = [s["shard"] for s in job["shards"]
+               if force or not shard_done(job_dir, job, s["shard"])]
+    if not pending:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    # spawn: workers must not inherit Streamlit's threads or an open sqlite handle
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+        futs = {pool.submit(run_shard, job_dir, k): k for k in pending}
+        for fut in as_completed(futs):
+            fut.result()
+            if on_done:
+                on_done(futs[fut])
+    return pending
+
+# ──────────────────────────────────────────────────────────────────
+#  Verify + Merge
+# ──────────────────────────────────────────────────────────────────
+def verify_job(job_dir: str, merged: str = None) -> dict:
+    """Cross-check manifests (and the merged ZIP if given) against the roster.
+
+    Every roster index must appear in exactly one manifest entry, every
+    archive path exactly once, and every shard ZIP member must match its
+    manifest CRC and size.
+    """
+    job, roster = load_job(job_dir)
+    seen, paths = {}, {}
+    report = {"job_id": job["job_id"], "expected": len(roster), "found": 0,
+              "missing_shards": [], "missing": [], "duplicates": [],
+              "path_clashes": [], "bad_members": [], "locked_shards": []}
+    for s in job["shards"]:
+        k = s["shard"]
+        if not shard_done(job_dir, job, k):
+            report["missing_shards"].append(k)
+            held = read_lock(job_dir, k)
+            if held is not None:
+                # Still running, or a dead worker — `run JOB --shard k` re-renders it
+                report["locked_shards"].append(dict(held, shard=k, stale=lock_is_stale(held)))
+            continue
+        m = _read_json(_shard_path(job_dir, k, "json"))
+        with zipfile.ZipFile(_shard_path(job_dir, k, "zip")) as zf:
+            infos = {i.filename: i for i in zf.infolist()}
+        for e in m["entries"]:
+            report["found"] += 1
+            if e["idx"] in seen:
+                report["duplicates"].append(roster[e["idx"]]["name"])
+            seen[e["idx"]] = k
+            paths[e["path"]] = paths.get(e["path"], 0) + 1
+            zi = infos.get(e["path"])
+            if zi is None or zi.CRC != e["crc"] or zi.file_size != e["size"]:
+                report["bad_members"].append(e["path"])
+    report["missing"]      = [roster[i]["name"] for i in range(len(roster)) if i not in seen]
+    report["path_clashes"] = sorted(p for p, n in paths.items() if n > 1)
+    if merged:
+        with zipfile.ZipFile(merged) as zf:
+            names = zf.namelist()
+            bad   = zf.testzip()
+        report["merged_members"] = len(names)
+        if bad:
+            report["bad_members"].append(f"{os.path.basename(merged)}:{bad}")
+        if len(names) != len(set(names)) or set(names) != set(paths):
+            report["bad_members"].append(f"{os.path.basename(merged)}: member set differs")
+    report["ok"] = not any(report[k] for k in
+                           ("missing_shards", "missing", "duplicates", "path_clashes", "bad_members"))
+    return report
+
+def merge_job(job_dir: str, db=None, out_dir: str = None) -> dict:
+    """Verify, then copy shard members into the final ZIP in roster order + write the Excel report.
+
+    With a db the cert IDs are issued once, guarded by job.json's "issued" flag;
+    issue_many skips IDs the log already holds, so a repeated merge is a no-op.
+    """
+    report = verify_job(job_dir)
+    if not report["ok"]:
+        hints = [f"shard {l['shard']} locked by {l['host']} pid {l['pid']}"
+                 + (" (stale — `run JOB --shard %d`)" % l["shard"] if l["stale"] else "")
+                 for l in report["locked_shards"]]
+        raise ValueError("shards failed verification: "
+                         + "; ".join(hints + [json.dumps(report, ensure_ascii=False)]))
+    job, roster = load_job(job_dir)
+    out_dir = out_dir or job_dir
+    stem    = job["event"] or "Event"
+    zpath   = os.path.join(out_dir, f"{stem}_Certificates.zip")
+    xpath   = os.path.join(out_dir, f"{stem}_Report.xlsx")
+
+    entries = {}
+    for s in job["shards"]:
+        for e in _read_json(_shard_path(job_dir, s["shard"], "json"))["entries"]:
+            entries[e["idx"]] = (s["shard"], e)
+
+    records, tmp = [], f"{zpath}.tmp{os.getpid()}"
+    with METRICS.time("bulk.merge"), zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as out:
+        open_shards = {}
+        try:
+            for i in range(len(roster)):
+                k, e = entries[i]
+                if k not in open_shards:
+                    open_shards[k] = zipfile.ZipFile(_shard_path(job_dir, k, "zip"))
+                out.writestr(e["path"], open_shards[k].read(e["path"]))
+                records.append(dict(roster[i], event=job["event"], cert_id=e["cert_id"],
+                                    date=e["date"], day=e["day"], time=e["time"]))
+        finally:
+            for zf in open_shards.values():
+                zf.close()
+    os.replace(tmp, zpath)
+    atomic_write(xpath, build_excel_report(job["event_info"], records))
+
+    if db is not None and not job.get("issued"):
+        for lo in range(0, len(records), 500):
+            db.issue_many(records[lo:lo + 500])
+        job["issued"] = datetime.now().isoformat(timespec="seconds")
+        atomic_write(os.path.join(job_dir, "job.json"), _json_bytes(job))
+    METRICS.incr("bulk_items_total", len(records))
+
+    report = verify_job(job_dir, merged=zpath)
+    return {"zip": zpath, "excel": xpath, "records": len(records), "verify": report}
+
+# ──────────────────────────────────────────────────────────────────
+#  CLI
+# ──────────────────────────────────────────────────────────────────
+def main():
+    ap  = argparse.ArgumentParser(description="Sharded bulk certificate generation")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("plan", help="snapshot roster + layout and split into shards")
+    p.add_argument("job")
+    p.add_argument("--token", required=True, help="event token from the QR URL (?e=...)")
+    p.add_argument("--shards", type=int, default=4)
+    p.add_argument("--by", choices=SHARD_BY, default="range")
+
+    p = sub.add_parser("run", help="render pending shards")
+    p.add_argument("job")
+    p.add_argument("--shard", type=int, action="append", help="only these shard numbers")
+    p.add_argument("--workers", type=int, default=0, help="local process pool size")
+    p.add_argument("--claim", action="store_true", help="claim shards via lock files (multi-host)")
+    p.add_argument("--force", action="store_true", help="re-render finished shards")
+    p.add_argument("--stale-after", type=float, default=LOCK_STALE_SECS,
+                   help="seconds before another host's lock counts as abandoned (--claim)")
+
+    p = sub.add_parser("merge", help="final ZIP + Excel report")
+    p.add_argument("job")
+    p.add_argument("--issue", action="store_true", help="write cert IDs to the certificate DB")
+
+    p = sub.add_parser("verify", help="check for missing/duplicate attendees")
+    p.add_argument("job")
+    a = ap.parse_args()
+
+    if a.cmd == "plan":
+        job = plan_from_token(a.job, a.token, shards=a.shards, by=a.by)
+        print(f"Planned {job['job_id']}: {job['total']} names → {len(job['shards'])} shards ({a.by})")
+    elif a.cmd == "run":
+        log = lambda k: print(f"  ✓ shard {k}")
+        if a.shard:
+            for k in a.shard:
+                run_shard(a.job, k)
+                log(k)
+        elif a.claim:
+            run_claimed(a.job, log, a.stale_after)
+        else:
+            run_job(a.job, a.workers or None, log, force=a.force)
+    elif a.cmd == "merge":
+        res = merge_job(a.job, db=CERT_DB if a.issue else None)
+        print(f"Merged {res['records']} → {res['zip']}\nReport → {res['excel']}")
+        sys.exit(0 if res["verify"]["ok"] else 1)
+    else:
+        rep = verify_job(a.job)
+        print(json.dumps(rep, indent=2, ensure_ascii=False))
+        sys.exit(0 if rep["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
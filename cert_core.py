@@ -0,0 +1,1353 @@
+"""
+╔══════════════════════════════════════════════════════════════════╗
+║        QR Certificate Generator Pro v2.0 — Core Rendering       ║
+║        Developed By: Abdul Samad | SBBU NAWABSHAH               ║
+╚══════════════════════════════════════════════════════════════════╝
+
+Pure rendering / report functions with NO Streamlit calls, so they can
+be imported by app.py, bench.py and background workers alike.
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import base64
+import hashlib
+import secrets
+import sqlite3
+import pstats
+import cProfile
+import zipfile
+import threading
+import tracemalloc
+import unicodedata
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from PIL import Image, ImageDraw, ImageFont, features
+import qrcode
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.lib.pagesizes import landscape, A4
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.units import mm
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+# ──────────────────────────────────────────────────────────────────
+#  Stage Metrics  (process-wide, shared by every session)
+# ──────────────────────────────────────────────────────────────────
+def percentile(sorted_vals: list, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+class StageMetrics:
+    """Rolling per-stage latency windows + monotonically increasing counters."""
+
+    def __init__(self, window: int = 2048):
+        self._lock     = threading.Lock()
+        self._window   = window
+        self._samples  = {}     # stage -> deque of seconds (last `window`)
+        self._totals   = {}     # stage -> [count, sum_seconds]
+        self._counters = {}     # (name, labels) -> value
+
+    @contextmanager
+    def time(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def observe(self, stage: str, secs: float):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self._window)
+                self._totals[stage]  = [0, 0.0]
+            self._samples[stage].append(secs)
+            tot = self._totals[stage]
+            tot[0] += 1
+            tot[1] += secs
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            data = {k: (sorted(v), list(self._totals[k])) for k, v in self._samples.items()}
+        rows = []
+        for stage, (vals, (count, total)) in sorted(data.items()):
+            rows.append({
+                "stage":   stage,
+                "count":   count,
+                "p50_ms":  round(percentile(vals, 50) * 1000, 2),
+                "p95_ms":  round(percentile(vals, 95) * 1000, 2),
+                "p99_ms":  round(percentile(vals, 99) * 1000, 2),
+                "mean_ms": round(total / count * 1000, 2) if count else 0.0,
+            })
+        return rows
+
+    def counters(self) -> dict:
+        with self._lock:
+            items = list(self._counters.items())
+        out = {}
+        for (name, labels), v in sorted(items):
+            lbl = ",".join(f"{k}={val}" for k, val in labels)
+            out[f"{name}{{{lbl}}}" if lbl else name] = v
+        return out
+
+    def prometheus_text(self, prefix: str = "certgen") -> str:
+        with self._lock:
+            data     = {k: (sorted(v), list(self._totals[k])) for k, v in self._samples.items()}
+            counters = list(self._counters.items())
+        lines = [f"# HELP {prefix}_stage_seconds Per-stage latency (rolling window quantiles)",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, (vals, (count, total)) in sorted(data.items()):
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f"{percentile(vals, q * 100):.6f}")
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+        seen = set()
+        for (name, labels), v in sorted(counters):
+            if name not in seen:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                seen.add(name)
+            lbl = ",".join(f'{k}="{val}"' for k, val in labels)
+            lines.append(f"{prefix}_{name}{{{lbl}}} {v}" if lbl else f"{prefix}_{name} {v}")
+        return "\n".join(lines) + "\n"
+
+METRICS = StageMetrics()
+
+class LRUCache:
+    """Small thread-safe LRU; hits/misses land in METRICS under cache=<name>."""
+
+    def __init__(self, name: str, maxsize: int = 256):
+        self.name    = name
+        self.maxsize = maxsize
+        self._lock   = threading.Lock()
+        self._data   = OrderedDict()
+
+    def get_or_make(self, key, make):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                METRICS.incr("cache_hits_total", cache=self.name)
+                return self._data[key]
+        METRICS.incr("cache_misses_total", cache=self.name)
+        val = make()
+        with self._lock:
+            self._data[key] = val
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return val
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+def profile_call(fn, *args, top: int = 30, **kwargs):
+    """Run fn once under cProfile + tracemalloc; returns (result, text report)."""
+    prof = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        result = prof.runcall(fn, *args, **kwargs)
+        snap = tracemalloc.take_snapshot()
+        cur, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    out = io.StringIO()
+    out.write("══ cProfile (cumulative) ══\n")
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top)
+    # Pillow's pixel buffers use their own allocator, so these are Python-side only
+    out.write(f"══ tracemalloc ══\ncurrent={cur/1e6:.1f} MB  peak={peak/1e6:.1f} MB\n")
+    for stat in snap.statistics("lineno")[:top // 2]:
+        out.write(f"{stat}\n")
+    return result, out.getvalue()
+
+# ──────────────────────────────────────────────────────────────────
+#  Font Map
+# ──────────────────────────────────────────────────────────────────
+FONT_MAP = {
+    "Regular":      ["arial.ttf",   "DejaVuSans.ttf",          "FreeSans.ttf"],
+    "Bold":         ["arialbd.ttf", "DejaVuSans-Bold.ttf",     "FreeSerifBold.ttf"],
+    "Italic":       ["ariali.ttf",  "DejaVuSans-Oblique.ttf",  "FreeSansOblique.ttf"],
+    "Bold Italic":  ["arialbi.ttf", "DejaVuSans-BoldOblique.ttf","FreeSansBoldOblique.ttf"],
+    "Times":        ["times.ttf",   "DejaVuSerif.ttf",         "FreeSerif.ttf"],
+    "Times Bold":   ["timesbd.ttf", "DejaVuSerif-Bold.ttf",    "FreeSerifBold.ttf"],
+    "Courier":      ["cour.ttf",    "DejaVuSansMono.ttf",      "FreeMono.ttf"],
+    "Courier Bold": ["courbd.ttf",  "DejaVuSansMono-Bold.ttf", "FreeMonoBold.ttf"],
+}
+
+def load_font(style: str, size: int) -> ImageFont.ImageFont:
+    for fname in FONT_MAP.get(style, FONT_MAP["Bold"]):
+        try:
+            return ImageFont.truetype(fname, size)
+        except Exception:
+            continue
+    return ImageFont.load_default()
+
+def hex_to_rgba(h: str, alpha=255):
+    h = h.lstrip("#")
+    return (int(h[0:2],16), int(h[2:4],16), int(h[4:6],16), alpha)
+
+# ──────────────────────────────────────────────────────────────────
+#  Core Functions
+# ──────────────────────────────────────────────────────────────────
+# Rasterise each name once; PNG, previews, PDFs and bulk runs all reuse the
+# mask. 512 masks of a 72pt name are ~40 MB at most.
+_GLYPH_CACHE = LRUCache("glyph_mask", 512)
+
+def text_mask(text: str, style: str, size: int) -> tuple:
+    """8-bit alpha mask of text and its bbox, cached per (text, font, size)."""
+    def _make():
+        font = load_font(style, size)
+        bbox = font.getbbox(text)
+        mask = Image.new("L", (max(1, bbox[2] - bbox[0]), max(1, bbox[3] - bbox[1])), 0)
+        ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, font=font, fill=255)
+        return mask, bbox
+    return _GLYPH_CACHE.get_or_make((text, style, int(size)), _make)
+
+def blend_text(img: Image.Image, glyph: tuple, color: str, center: tuple):
+    """Blend a text_mask() result into img (RGB) in place, centred like ImageDraw.text was."""
+    mask, bbox = glyph
+    tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    x = center[0] - tw // 2 + bbox[0]
+    y = center[1] - th // 2 + bbox[1]
+    # paste(colour, box, mask) is Pillow's C alpha blend over just the mask's box
+    img.paste(hex_to_rgba(color)[:3], (x, y), mask)
+
+def _qr_stamp(url: str, side: int) -> Image.Image:
+    # Per-certificate URL: never reused, so skip the QR caches and the PNG round trip
+    qr = qrcode.QRCode(version=None, error_correction=QR_EC_LEVELS["M"], box_size=1, border=1)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    n      = len(matrix)
+    mask   = Image.new("L", (n, n))
+    mask.putdata([255 if dark else 0 for row in matrix for dark in row])
+    stamp  = Image.new("RGB", (side, side), "white")
+    stamp.paste((11, 19, 43), (0, 0), mask.resize((side, side), Image.NEAREST))
+    return stamp
+
+def draw_verification(img: Image.Image, cert_id: str, verify_url: str = None):
+    """Stamp the cert ID (and optionally a verify QR) into the bottom-right corner."""
+    w, h   = img.size
+    margin = int(min(w, h) * 0.03)
+    draw   = ImageDraw.Draw(img)
+    font   = load_font("Courier Bold", max(12, int(h * 0.018)))
+    label  = f"ID: {format_cert_id(cert_id)}"
+    bbox   = draw.textbbox((0, 0), label, font=font)
+    tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    x_right, y_bottom = w - margin, h - margin
+    if verify_url:
+        side = int(min(w, h) * 0.12)
+        img.paste(_qr_stamp(verify_url, side), (x_right - side, y_bottom - th - 6 - side))
+        x_center = x_right - side // 2
+    else:
+        x_center = x_right - tw // 2
+    draw.text((x_center - tw // 2, y_bottom - th), label, font=font, fill=(60, 60, 60))
+
+def render_certificate(name: str, template_bytes: bytes, c: dict,
+                       cert_id: str = None, verify_url: str = None) -> Image.Image:
+    """The single expensive step — every output format is encoded from this RGB image."""
+    m = METRICS
+    with m.time("render.decode"):
+        img = Image.open(io.BytesIO(template_bytes)).convert("RGB")
+    w, h = img.size
+    with m.time("render.glyph_mask"):
+        glyph = text_mask(name, c["font_style"], c["font_size"])
+    with m.time("render.composite"):
+        px = int(w * c["text_x"] / 100)
+        py = int(h * c["text_y"] / 100)
+        blend_text(img, glyph, c["text_color"], (px, py))
+        if cert_id:
+            draw_verification(img, cert_id, verify_url)
+    m.incr("renders_total")
+    return img
+
+def generate_certificate(name: str, template_bytes: bytes, c: dict,
+                         cert_id: str = None, verify_url: str = None) -> bytes:
+    with METRICS.time("render.total"):
+        final = render_certificate(name, template_bytes, c, cert_id, verify_url)
+        return encode_image(final, "png")
+
+def image_to_pdf(img: Image.Image, name: str, event_name: str) -> bytes:
+    m = METRICS
+    with m.time("pdf.total"):
+        buf    = io.BytesIO()
+        pw, ph = landscape(A4)
+        c      = pdf_canvas.Canvas(buf, pagesize=(pw, ph))
+        iw, ih = img.size
+        scale  = min(pw/iw, ph/ih)
+        nw, nh = iw*scale, ih*scale
+        x, y   = (pw-nw)/2, (ph-nh)/2
+        with m.time("pdf.build"):
+            # ImageReader takes the PIL image directly — no PNG round-trip
+            c.drawImage(ImageReader(img), x, y, nw, nh)
+            c.setFont("Helvetica-Bold", 9)
+            c.setFillColorRGB(.5,.5,.5)
+            c.drawCentredString(pw/2, 16,
+                f"{name} | {event_name} | "
+                f"{datetime.now().strftime('%Y-%m-%d %H:%M')}")
+            c.save()
+        out = buf.getvalue()
+    m.incr("pdfs_total")
+    m.incr("bytes_produced_total", len(out), kind="pdf")
+    return out
+
+def png_to_pdf(png_bytes: bytes, name: str, event_name: str) -> bytes:
+    with METRICS.time("pdf.decode"):
+        img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
+    return image_to_pdf(img, name, event_name)
+
+# ──────────────────────────────────────────────────────────────────
+#  Delivery formats  (one render → preview + downloads)
+# ──────────────────────────────────────────────────────────────────
+HAS_WEBP = features.check("webp")
+
+# Download encodes: PNG stays lossless; JPEG keeps 4:4:4 chroma so thin
+# text edges don't smear; WebP method 4 is the speed/size sweet spot.
+ENCODE_OPTS = {
+    "png":  {"format": "PNG",  "dpi": (300,300), "compress_level": 6},
+    "jpeg": {"format": "JPEG", "dpi": (300,300), "quality": 92, "subsampling": 0},
+    "webp": {"format": "WEBP", "quality": 90, "method": 4},
+}
+PREVIEW_OPTS = {
+    "webp": {"format": "WEBP", "quality": 78, "method": 2},
+    "jpeg": {"format": "JPEG", "quality": 80, "progressive": True},
+}
+DELIVERY_FORMATS = {
+    # key: (button label, mime, file extension)
+    "png":  ("PNG",           "image/png",       "png"),
+    "jpeg": ("JPEG (chhota)", "image/jpeg",      "jpg"),
+    "webp": ("WebP (sabse chhota)", "image/webp", "webp"),
+    "pdf":  ("PDF",           "application/pdf", "pdf"),
+}
+PREVIEW_WIDTH = 1080
+
+def encode_image(img: Image.Image, fmt: str, opts: dict = None) -> bytes:
+    if fmt == "webp" and not HAS_WEBP:
+        fmt = "jpeg"
+    opts = opts or ENCODE_OPTS[fmt]
+    with METRICS.time(f"encode.{fmt}"):
+        buf = io.BytesIO()
+        img.save(buf, **opts)
+        out = buf.getvalue()
+    METRICS.incr("bytes_produced_total", len(out), kind=fmt)
+    return out
+
+def make_preview(img: Image.Image, fmt: str = "webp", max_width: int = PREVIEW_WIDTH) -> bytes:
+    """Screen-sized copy for phones; reducing_gap lets Pillow box-reduce first (fast)."""
+    if fmt == "webp" and not HAS_WEBP:
+        fmt = "jpeg"
+    w, h  = img.size
+    scale = min(1.0, max_width / w, max_width / h)
+    with METRICS.time("preview.resize"):
+        # resize() returns the small image directly — no full-size copy to shrink in place
+        small = img if scale >= 1 else img.resize(
+            (max(1, round(w * scale)), max(1, round(h * scale))),
+            Image.BILINEAR, reducing_gap=2.0)
+    return encode_image(small, fmt, PREVIEW_OPTS[fmt])
+
+def render_variants(name: str, template_bytes: bytes, c: dict, event_name: str,
+                    formats=("png", "pdf"), preview: str = "webp",
+                    cert_id: str = None, verify_url: str = None) -> dict:
+    """Render once, then encode a preview plus each requested download format."""
+    with METRICS.time("render.variants"):
+        img = render_certificate(name, template_bytes, c, cert_id, verify_url)
+        out = {"preview": make_preview(img, preview) if preview else None}
+        for fmt in formats:
+            out[fmt] = (image_to_pdf(img, name, event_name) if fmt == "pdf"
+                        else encode_image(img, fmt))
+    return out
+
+# ──────────────────────────────────────────────────────────────────
+#  Render Scheduler  (one bounded queue shared by ALL sessions)
+# ──────────────────────────────────────────────────────────────────
+RENDER_WORKERS   = min(4, os.cpu_count() or 1)
+RENDER_MEM_MB    = 512
+RENDER_MAX_QUEUE = 500
+
+def estimate_render_bytes(template_bytes: bytes, formats=("png", "pdf"),
+                          preview: str = "webp") -> int:
+    """Peak bytes of one render_variants() call, from the template header alone.
+
+    RGB canvas + encoder headroom, plus another full-size RGB buffer for the
+    PDF's ImageReader; the preview only adds its own (screen-sized) pixels.
+    """
+    w, h = Image.open(io.BytesIO(template_bytes)).size
+    per_px = 3 + 3
+    if "pdf" in formats:
+        per_px += 3
+    extra = PREVIEW_WIDTH * PREVIEW_WIDTH * 3 if preview else 0
+    return w * h * per_px + extra
+
+class RenderJob:
+    def __init__(self, fn, args, cost: int):
+        self.fn     = fn
+        self.args   = args
+        self.cost   = cost
+        self.future = Future()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+class RenderScheduler:
+    """FIFO render queue with a bounded worker pool and a memory budget."""
+
+    def __init__(self, max_workers: int, mem_mb: int, max_queue: int):
+        self._cv        = threading.Condition()
+        self._queue     = deque()
+        self._threads   = 0
+        self._active    = 0
+        self._mem_used  = 0
+        self._avg_secs  = 1.0
+        self.configure(max_workers, mem_mb, max_queue)
+
+    def configure(self, max_workers: int, mem_mb: int, max_queue: int):
+        with self._cv:
+            self.max_workers = max(1, int(max_workers))
+            self.mem_budget  = max(1, int(mem_mb)) * 1024 * 1024
+            self.max_queue   = max(1, int(max_queue))
+            while self._threads < self.max_workers:
+                self._threads += 1
+                threading.Thread(target=self._worker, daemon=True,
+                                 name=f"render-{self._threads}").start()
+            self._cv.notify_all()
+
+    def submit(self, fn, *args, cost: int = 0):
+        """Queue a render; returns None when the queue is full (admission control)."""
+        with self._cv:
+            if len(self._queue) >= self.max_queue:
+                return None
+            job = RenderJob(fn, args, cost)
+            self._queue.append(job)
+            self._cv.notify_all()
+            return job
+
+    def cancel(self, job: RenderJob) -> bool:
+        """Drop a job that has not started yet; False once a worker has picked it up."""
+        with self._cv:
+            try:
+                self._queue.remove(job)
+            except ValueError:
+                return False
+            job.future.cancel()
+            self._cv.notify_all()
+            return True
+
+    def position(self, job: RenderJob) -> int:
+        with self._cv:
+            try:
+                return self._queue.index(job) + 1
+            except ValueError:
+                return 0
+
+    def eta(self, job: RenderJob) -> float:
+        pos = self.position(job)
+        return (pos / self.max_workers + 1) * self._avg_secs
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {
+                "queued":   len(self._queue),
+                "active":   self._active,
+                "workers":  self.max_workers,
+                "mem_mb":   round(self._mem_used / 1024 / 1024, 1),
+                "avg_secs": round(self._avg_secs, 2),
+            }
+
+    def _can_start(self, job: RenderJob) -> bool:
+        # An oversized job may still run alone, otherwise it would starve forever
+        return (self._active == 0 or
+                self._mem_used + job.cost <= self.mem_budget)
+
+    def _worker(self):
+        while True:
+            with self._cv:
+                while True:
+                    if self._threads > self.max_workers:
+                        self._threads -= 1
+                        return
+                    # Strict FIFO: only the head may start, so waits stay predictable
+                    if self._queue and self._can_start(self._queue[0]):
+                        break
+                    self._cv.wait()
+                job = self._queue.popleft()
+                self._active   += 1
+                self._mem_used += job.cost
+            t0 = time.perf_counter()
+            try:
+                job.future.set_result(job.fn(*job.args))
+            except Exception as e:
+                job.future.set_exception(e)
+            dt = time.perf_counter() - t0
+            with self._cv:
+                self._active   -= 1
+                self._mem_used -= job.cost
+                self._avg_secs  = 0.8 * self._avg_secs + 0.2 * dt
+                self._cv.notify_all()
+
+QR_EC_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+_QR_MATRIX_CACHE = LRUCache("qr_matrix", 512)
+_QR_PNG_CACHE    = LRUCache("qr_png", 256)
+
+def qr_matrix(payload: str, ec: str = "M", border: int = 4) -> list:
+    def _make():
+        qr = qrcode.QRCode(version=None, error_correction=QR_EC_LEVELS[ec],
+                           box_size=1, border=border)
+        qr.add_data(payload)
+        qr.make(fit=True)
+        return qr.get_matrix()
+    return _QR_MATRIX_CACHE.get_or_make((payload, ec, border), _make)
+
+def make_qr(url: str, fill: str = "#0b132b", back: str = "white",
+            box_size: int = 10, border: int = 4, ec: str = "M") -> bytes:
+    def _make():
+        qr = qrcode.QRCode(version=None, error_correction=QR_EC_LEVELS[ec],
+                           box_size=box_size, border=border)
+        qr.add_data(url)
+        qr.make(fit=True)
+        img = qr.make_image(fill_color=fill, back_color=back)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        METRICS.incr("qr_total")
+        return buf.getvalue()
+    return _QR_PNG_CACHE.get_or_make((url, fill, back, box_size, border, ec), _make)
+
+def build_excel_report(event_info: dict, log: list) -> bytes:
+    wb   = openpyxl.Workbook()
+    hfil = PatternFill("solid", fgColor="1E1B4B")
+    hfnt = Font(bold=True, color="FFFFFF", size=12)
+
+    # ── Sheet 1: Event Summary ──────────────────────────────────
+    ws1 = wb.active
+    ws1.title = "Event Summary"
+    ws1.merge_cells("A1:C1")
+    t = ws1["A1"]
+    t.value = f"🎓 {event_info.get('event_name','Event')} — Certificate Report"
+    t.font  = Font(bold=True, color="FFD159", size=15)
+    t.fill  = PatternFill("solid", fgColor="0B132B")
+    t.alignment = Alignment(horizontal="center", vertical="center")
+    ws1.row_dimensions[1].height = 36
+
+    info_rows = [
+        ("Event Name",   event_info.get("event_name","")),
+        ("Topic",        event_info.get("topic","")),
+        ("Date",         event_info.get("event_date","")),
+        ("Day",          event_info.get("day","")),
+        ("Venue",        event_info.get("venue","")),
+        ("Organizer",    event_info.get("organizer","")),
+        ("Generated At", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        ("Total Certs",  str(len(log))),
+    ]
+    for r, (k, v) in enumerate(info_rows, 2):
+        ws1[f"A{r}"] = k;  ws1[f"A{r}"].font = Font(bold=True, color="7ECEFD")
+        ws1[f"B{r}"] = v;  ws1[f"B{r}"].font = Font(color="E0E0E0")
+        ws1[f"A{r}"].fill = hfil
+    ws1.column_dimensions["A"].width = 20
+    ws1.column_dimensions["B"].width = 45
+
+    # ── Sheet 2: Certificate Log ─────────────────────────────────
+    ws2 = wb.create_sheet("Certificate Log")
+    headers2 = ["#","Full Name","Department","Batch","Roll No","Category","Event","Date","Day","Time","Cert ID"]
+    for ci, h in enumerate(headers2, 1):
+        cell = ws2.cell(row=1, column=ci, value=h)
+        cell.font = hfnt; cell.fill = hfil
+        cell.alignment = Alignment(horizontal="center")
+    for ri, rec in enumerate(log, 2):
+        row_data = [
+            ri-1,
+            rec.get("name",""),
+            rec.get("department",""),
+            rec.get("batch",""),
+            rec.get("roll_no",""),
+            rec.get("category",""),
+            rec.get("event",""),
+            rec.get("date",""),
+            rec.get("day",""),
+            rec.get("time",""),
+            format_cert_id(rec.get("cert_id","")),
+        ]
+        for ci, val in enumerate(row_data, 1):
+            c2 = ws2.cell(row=ri, column=ci, value=val)
+            c2.font = Font(color="E0E0E0")
+            c2.fill = PatternFill("solid", fgColor="0F1B35" if ri%2==0 else "1E1B4B")
+            c2.alignment = Alignment(horizontal="center" if ci==1 else "left")
+    for ci, w in enumerate([5,28,22,16,14,15,30,13,12,10,18], 1):
+        ws2.column_dimensions[get_column_letter(ci)].width = w
+
+    # ── Sheet 3: Category Summary ────────────────────────────────
+    ws3 = wb.create_sheet("Category Summary")
+    for ci, h in enumerate(["Category","Count","Names"], 1):
+        cell = ws3.cell(row=1, column=ci, value=h)
+        cell.font = hfnt; cell.fill = hfil
+    categories: dict = {}
+    for rec in log:
+        cat = rec.get("category", "Other")
+        categories.setdefault(cat, []).append(rec["name"])
+    for ri, (cat, names) in enumerate(categories.items(), 2):
+        ws3[f"A{ri}"] = cat;           ws3[f"A{ri}"].font = Font(bold=True, color="FFD159")
+        ws3[f"B{ri}"] = len(names);    ws3[f"B{ri}"].font = Font(color="E0E0E0")
+        # Build detailed name list with roll no
+        detail_list = []
+        for rec in log:
+            if rec.get("category","") == cat:
+                detail_list.append(f"{rec['name']} ({rec.get('roll_no','')})")
+        display = ", ".join(detail_list) if detail_list else ", ".join(names)
+        ws3[f"C{ri}"] = display; ws3[f"C{ri}"].font = Font(color="E0E0E0")
+        for col in "ABC":
+            ws3[f"{col}{ri}"].fill = hfil
+    for col, w in [("A",20),("B",10),("C",70)]:
+        ws3.column_dimensions[col].width = w
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+# ──────────────────────────────────────────────────────────────────
+#  Event Store  (short QR token → layout + template, on disk)
+# ──────────────────────────────────────────────────────────────────
+DATA_DIR = os.environ.get("CERTGEN_DATA_DIR", "cert_data")
+
+def _short_hash(data: bytes, n_bytes: int = 5) -> str:
+    # 5 bytes → 8 base32 chars: short enough for a low-version QR
+    return base64.b32encode(hashlib.blake2b(data, digest_size=n_bytes).digest()).decode()
+
+def atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class EventStore:
+    """Layouts keyed by a content-derived token; identical layouts share one token."""
+
+    def __init__(self, root: str):
+        self.root   = root
+        self._lock  = threading.Lock()
+        self._cache = {}
+
+    def _path(self, kind: str, key: str, ext: str) -> str:
+        return os.path.join(self.root, kind, f"{key}.{ext}")
+
+    def save(self, layout: dict, template_bytes: bytes = None) -> str:
+        layout = dict(layout)
+        if template_bytes:
+            tid = _short_hash(template_bytes, 10)
+            tpath = self._path("templates", tid, "bin")
+            if not os.path.exists(tpath):
+                atomic_write(tpath, template_bytes)
+            layout["template_id"] = tid
+        raw   = json.dumps(layout, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        token = _short_hash(raw)
+        path  = self._path("events", token, "json")
+        if not os.path.exists(path):
+            atomic_write(path, raw)
+        with self._lock:
+            self._cache[token] = layout
+        return token
+
+    def get(self, token: str):
+        token = (token or "").strip().upper()
+        with self._lock:
+            if token in self._cache:
+                return self._cache[token]
+        if not token.isalnum():
+            return None
+        try:
+            with open(self._path("events", token, "json"), encoding="utf-8") as f:
+                layout = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._cache[token] = layout
+        return layout
+
+    def template(self, template_id: str):
+        if not template_id or not template_id.isalnum():
+            return None
+        try:
+            with open(self._path("templates", template_id, "bin"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+EVENTS = EventStore(DATA_DIR)
+
+def event_qr_url(app_url: str, token: str) -> str:
+    return f"{app_url.rstrip('/')}/?page=cert&e={token}"
+
+# ──────────────────────────────────────────────────────────────────
+#  Certificate DB  (SQLite, primary-key lookups stay fast at 100k+ rows)
+# ──────────────────────────────────────────────────────────────────
+CERT_ID_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"   # no 0/O/1/I on printouts
+
+def new_cert_id() -> str:
+    return "".join(secrets.choice(CERT_ID_ALPHABET) for _ in range(12))
+
+def normalize_cert_id(cert_id: str) -> str:
+    return (cert_id or "").replace("-", "").replace(" ", "").strip().upper()
+
+def format_cert_id(cert_id: str) -> str:
+    cid = normalize_cert_id(cert_id)
+    return "-".join(cid[i:i + 4] for i in range(0, len(cid), 4))
+
+def verify_url_for(app_url: str, cert_id: str) -> str:
+    return f"{app_url.rstrip('/')}/?page=verify&id={normalize_cert_id(cert_id)}"
+
+CERT_COLUMNS = ["cert_id", "name", "department", "batch", "roll_no",
+                "category", "event", "date", "day", "time"]
+
+class CertDB:
+    """One SQLite file shared by every session; writes are serialised by a lock."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS certificates (
+        cert_id    TEXT PRIMARY KEY,
+        name       TEXT NOT NULL,
+        department TEXT DEFAULT '',
+        batch      TEXT DEFAULT '',
+        roll_no    TEXT DEFAULT '',
+        category   TEXT DEFAULT '',
+        event      TEXT DEFAULT '',
+        date       TEXT DEFAULT '',
+        day        TEXT DEFAULT '',
+        time       TEXT DEFAULT '',
+        archived   INTEGER DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS cert_event_when ON certificates (event, archived, date, time);
+    CREATE INDEX IF NOT EXISTS cert_event_cat  ON certificates (event, archived, category);
+    CREATE INDEX IF NOT EXISTS cert_event_dept ON certificates (event, archived, department);
+
+    -- Running totals, bumped on every issue so analytics never scan the log
+    CREATE TABLE IF NOT EXISTS cert_stats (
+        event      TEXT NOT NULL,
+        category   TEXT NOT NULL,
+        department TEXT NOT NULL,
+        date       TEXT NOT NULL,
+        n          INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (event, category, department, date)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS registrations (
+        id         INTEGER PRIMARY KEY,
+        event      TEXT NOT NULL,
+        category   TEXT NOT NULL,
+        name       TEXT NOT NULL,
+        name_key   TEXT NOT NULL,
+        department TEXT DEFAULT '',
+        batch      TEXT DEFAULT '',
+        roll_no    TEXT DEFAULT '',
+        roll_key   TEXT NOT NULL DEFAULT '',
+        -- Same name twice is two students when their roll numbers differ;
+        -- name-only rosters (.txt, Add Name without roll) leave roll_key empty
+        UNIQUE (event, category, name_key, roll_key)
+    );
+    """
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(certificates)")}
+            if cols and "archived" not in cols:
+                # DBs from before the log view: add the column, backfill running totals
+                conn.execute("ALTER TABLE certificates ADD COLUMN archived INTEGER DEFAULT 0")
+                conn.executescript(self.SCHEMA)
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cert_stats "
+                        "SELECT event, category, department, date, COUNT(*) "
+                        "FROM certificates GROUP BY event, category, department, date")
+            rcols = {r[1] for r in conn.execute("PRAGMA table_info(registrations)")}
+            if rcols and "roll_key" not in rcols:
+                # Roll numbers joined the dedup key — rebuild to change the UNIQUE constraint
+                conn.execute("ALTER TABLE registrations RENAME TO registrations_v1")
+                conn.executescript(self.SCHEMA)
+                rows = conn.execute(
+                    "SELECT id, event, category, name, name_key, department, batch, roll_no "
+                    "FROM registrations_v1").fetchall()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO registrations (id, event, category, name, name_key, "
+                        "department, batch, roll_no, roll_key) VALUES (?,?,?,?,?,?,?,?,?)",
+                        [tuple(r) + (roll_key(r["roll_no"]),) for r in rows])
+                    conn.execute("DROP TABLE registrations_v1")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def issue_many(self, records: list) -> int:
+        """Log certificates; IDs already present are skipped (and not re-counted). Returns rows added."""
+        rows = [tuple(r.get(k, "") or "" for k in CERT_COLUMNS) for r in records]
+        sql  = (f"INSERT OR IGNORE INTO certificates ({','.join(CERT_COLUMNS)}) "
+                f"VALUES ({','.join('?' * len(CERT_COLUMNS))})")
+        with self._lock:
+            conn = self._db()
+            with conn:
+                added = [r for r in rows if conn.execute(sql, r).rowcount]
+                conn.executemany(
+                    "INSERT INTO cert_stats (event, category, department, date, n) "
+                    "VALUES (?,?,?,?,1) ON CONFLICT (event, category, department, date) "
+                    "DO UPDATE SET n = n + 1",
+                    [(r[6], r[5], r[2], r[7]) for r in added])
+        return len(added)
+
+    def issue(self, record: dict):
+        self.issue_many([record])
+
+    def issued_ids(self, event: str) -> dict:
+        """(category, name_key, roll_key) → cert_id for everyone already in the live log."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT category, name, roll_no, cert_id FROM certificates "
+                "WHERE event = ? AND archived = 0 ORDER BY date, time", (event,)).fetchall()
+        out = {}
+        for cat, nm, roll, cid in rows:
+            out.setdefault((cat, name_key(nm), roll_key(roll)), cid)
+        return out
+
+    def get(self, cert_id: str):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM certificates WHERE cert_id = ?",
+                (normalize_cert_id(cert_id),)).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM certificates").fetchone()[0]
+
+    # ── Certificate log (Tab 4) ──────────────────────────────────
+    LOG_SORTS = {
+        "Newest first": "date DESC, time DESC",
+        "Oldest first": "date, time",
+        "Name A→Z":     "name",
+        "Category":     "category, date DESC, time DESC",
+    }
+
+    def _log_where(self, event: str, category=None, department=None,
+                   date_from=None, date_to=None, query: str = "") -> tuple:
+        # None = no filter; "" is a real value (bulk rows from name-only rosters)
+        where, args = ["event = ?", "archived = 0"], [event]
+        if category is not None:
+            where.append("category = ?")
+            args.append(category)
+        if department is not None:
+            where.append("department = ?")
+            args.append(department)
+        if date_from:
+            where.append("date >= ?")
+            args.append(str(date_from))
+        if date_to:
+            where.append("date <= ?")
+            args.append(str(date_to))
+        if query:
+            where.append("(name LIKE ? ESCAPE '\\' OR roll_no LIKE ? ESCAPE '\\')")
+            pat = "%" + query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            args += [pat, pat]
+        return " AND ".join(where), args
+
+    def query_log(self, event: str, offset: int = 0, limit: int = 50,
+                  sort: str = "Newest first", **filters) -> tuple:
+        """One page of the certificate log + total matching rows."""
+        where, args = self._log_where(event, **filters)
+        order = self.LOG_SORTS.get(sort, self.LOG_SORTS["Newest first"])
+        with self._lock:
+            conn  = self._db()
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM certificates WHERE {where}", args).fetchone()[0]
+            rows  = conn.execute(
+                f"SELECT {','.join(CERT_COLUMNS)} FROM certificates WHERE {where} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?", args + [limit, offset]).fetchall()
+        return [dict(r) for r in rows], total
+
+    def iter_log(self, event: str, sort: str = "Oldest first", chunk: int = 2000, **filters):
+        """Whole (filtered) log in chunks — only for on-demand exports."""
+        offset = 0
+        while True:
+            rows, _ = self.query_log(event, offset, chunk, sort, **filters)
+            yield from rows
+            if len(rows) < chunk:
+                return
+            offset += chunk
+
+    def log_stats(self, event: str) -> dict:
+        """Totals from the running cert_stats table (O(categories × days), not O(log))."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT category, department, date, n FROM cert_stats WHERE event = ?",
+                (event,)).fetchall()
+        out = {"total": 0, "by_category": {}, "by_department": {}, "by_date": {}}
+        for cat, dept, day, n in rows:
+            out["total"] += n
+            out["by_category"][cat]    = out["by_category"].get(cat, 0) + n
+            out["by_department"][dept] = out["by_department"].get(dept, 0) + n
+            out["by_date"][day]        = out["by_date"].get(day, 0) + n
+        return out
+
+    def archive_log(self, event: str) -> int:
+        """Hide an event's log from Tab 4; the rows stay so IDs still verify."""
+        with self._lock:
+            conn = self._db()
+            with conn:
+                cur = conn.execute(
+                    "UPDATE certificates SET archived = 1 WHERE event = ? AND archived = 0",
+                    (event,))
+                conn.execute("DELETE FROM cert_stats WHERE event = ?", (event,))
+            return cur.rowcount
+
+    # ── Registrations (roster) ───────────────────────────────────
+    def register_many(self, event: str, rows: list) -> int:
+        """Add rows deduped on (category, name, roll no); returns rows added.
+
+        A name-only row (.txt roster, Add Name) and a later row with a roll no
+        are the same person: the roll no is filled into the existing row. A
+        name-only row is skipped when the name is already registered with any roll no.
+        """
+        data = [(event, r.get("category") or "Participant", r["name"], name_key(r["name"]),
+                 r.get("department", "") or "", r.get("batch", "") or "",
+                 r.get("roll_no", "") or "", roll_key(r.get("roll_no")))
+                for r in rows]
+        insert = ("INSERT OR IGNORE INTO registrations "
+                  "(event, category, name, name_key, department, batch, roll_no, roll_key) "
+                  "SELECT ?,?,?,?,?,?,?,? WHERE ? != '' OR NOT EXISTS (SELECT 1 FROM registrations "
+                  "WHERE event = ? AND category = ? AND name_key = ?)")
+        upgrade = ("UPDATE OR IGNORE registrations SET roll_no = ?, roll_key = ?, "
+                   "department = CASE department WHEN '' THEN ? ELSE department END, "
+                   "batch = CASE batch WHEN '' THEN ? ELSE batch END "
+                   "WHERE id = (SELECT id FROM registrations WHERE event = ? AND category = ? "
+                   "AND name_key = ? AND roll_key = '' LIMIT 1)")
+        added = 0
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for ev, cat, nm, nk, dept, batch, roll, rk in data:
+                    if rk:
+                        conn.execute(upgrade, (roll, rk, dept, batch, ev, cat, nk))
+                    added += conn.execute(insert, (ev, cat, nm, nk, dept, batch, roll, rk,
+                                                   rk, ev, cat, nk)).rowcount
+        return added
+
+    def register(self, event: str, category: str, name: str, **extra) -> bool:
+        return self.register_many(event, [dict(extra, category=category, name=name)]) > 0
+
+    def category_counts(self, event: str) -> dict:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT category, COUNT(*) FROM registrations WHERE event = ? "
+                "GROUP BY category", (event,)).fetchall()
+        return {cat: n for cat, n in rows}
+
+    def roster(self, event: str, limit: int = -1) -> list:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT name, category FROM registrations WHERE event = ? "
+                "ORDER BY category, id LIMIT ?", (event, limit)).fetchall()
+        return [(n, c) for n, c in rows]
+
+    def roster_rows(self, event: str) -> list:
+        """Full registration rows in roster order — the snapshot a sharded job is planned from."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT name, category, department, batch, roll_no FROM registrations "
+                "WHERE event = ? ORDER BY category, id", (event,)).fetchall()
+        return [dict(r) for r in rows]
+
+    REG_EDITABLE = ("category", "name", "department", "batch", "roll_no")
+
+    def search_registrations(self, event: str, category: str = None, query: str = "",
+                             offset: int = 0, limit: int = 50) -> tuple:
+        """One page of registrations + total matching count, filtered in SQL."""
+        where, args = ["event = ?"], [event]
+        if category:
+            where.append("category = ?")
+            args.append(category)
+        q = name_key(query) if query else ""
+        if q:
+            where.append("(name_key LIKE ? ESCAPE '\\' OR roll_no LIKE ? ESCAPE '\\')")
+            pat = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            args += [pat, pat]
+        sql_where = " AND ".join(where)
+        with self._lock:
+            conn  = self._db()
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM registrations WHERE {sql_where}", args).fetchone()[0]
+            rows  = conn.execute(
+                f"SELECT id, name, category, department, batch, roll_no FROM registrations "
+                f"WHERE {sql_where} ORDER BY category, id LIMIT ? OFFSET ?",
+                args + [limit, offset]).fetchall()
+        return [dict(r) for r in rows], total
+
+    def update_registration(self, reg_id: int, **fields) -> bool:
+        """Row-level edit; False when the new name/category/roll no collides with an existing row."""
+        fields = {k: v for k, v in fields.items() if k in self.REG_EDITABLE}
+        if not fields:
+            return True
+        if "name" in fields:
+            fields["name"]     = clean_name(fields["name"])
+            fields["name_key"] = name_key(fields["name"])
+        if "roll_no" in fields:
+            fields["roll_key"] = roll_key(fields["roll_no"])
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            conn = self._db()
+            try:
+                with conn:
+                    conn.execute(f"UPDATE registrations SET {sets} WHERE id = ?",
+                                 list(fields.values()) + [reg_id])
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def delete_registrations(self, reg_ids: list) -> int:
+        with self._lock:
+            conn = self._db()
+            with conn:
+                cur = conn.executemany("DELETE FROM registrations WHERE id = ?",
+                                       [(i,) for i in reg_ids])
+            return cur.rowcount
+
+CERT_DB = CertDB(os.path.join(DATA_DIR, "certgen.db"))
+
+# ──────────────────────────────────────────────────────────────────
+#  Print-ready QR sheets  (vector — scales to any printer)
+# ──────────────────────────────────────────────────────────────────
+def build_qr_sheet_pdf(entries: list, cols: int = 3, rows: int = 4,
+                       ec: str = "M", title: str = "") -> bytes:
+    """entries = [(label, payload), ...] → A4 PDF, cols×rows QR codes per page."""
+    buf    = io.BytesIO()
+    pw, ph = A4
+    c      = pdf_canvas.Canvas(buf, pagesize=A4)
+    margin = 12 * mm
+    top    = 14 * mm if title else 0
+    cell_w = (pw - 2 * margin) / cols
+    cell_h = (ph - 2 * margin - top) / rows
+    per    = cols * rows
+    for start in range(0, len(entries), per):
+        if title:
+            c.setFont("Helvetica-Bold", 14)
+            c.drawCentredString(pw / 2, ph - margin - 6 * mm, title)
+        for k, (label, payload) in enumerate(entries[start:start + per]):
+            r, col = divmod(k, cols)
+            x0 = margin + col * cell_w
+            y0 = ph - margin - top - (r + 1) * cell_h
+            mat  = qr_matrix(payload, ec)
+            side = min(cell_w, cell_h - 12 * mm) * 0.9
+            mod  = side / len(mat)
+            qx   = x0 + (cell_w - side) / 2
+            qy   = y0 + 10 * mm
+            c.setFillColorRGB(0.043, 0.075, 0.169)
+            for yi, row in enumerate(mat):
+                xi = 0
+                while xi < len(row):
+                    if row[xi]:
+                        run = xi
+                        while run < len(row) and row[run]:
+                            run += 1
+                        c.rect(qx + xi * mod, qy + side - (yi + 1) * mod,
+                               (run - xi) * mod, mod, stroke=0, fill=1)
+                        xi = run
+                    else:
+                        xi += 1
+            c.setFillColorRGB(0, 0, 0)
+            c.setFont("Helvetica-Bold", 10)
+            c.drawCentredString(x0 + cell_w / 2, y0 + 5 * mm, str(label)[:48])
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def build_qr_sheet_svg(entries: list, cols: int = 3, ec: str = "M",
+                       cell_mm: int = 60) -> str:
+    """Same grid as the PDF sheet but one continuous SVG (mm units)."""
+    rows  = (len(entries) + cols - 1) // cols
+    lab_h = 10
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" '
+             f'width="{cols * cell_mm}mm" height="{rows * (cell_mm + lab_h)}mm" '
+             f'viewBox="0 0 {cols * cell_mm} {rows * (cell_mm + lab_h)}">',
+             '<rect width="100%" height="100%" fill="white"/>']
+    for k, (label, payload) in enumerate(entries):
+        r, col = divmod(k, cols)
+        mat  = qr_matrix(payload, ec)
+        side = cell_mm * 0.9
+        mod  = side / len(mat)
+        ox   = col * cell_mm + (cell_mm - side) / 2
+        oy   = r * (cell_mm + lab_h) + (cell_mm - side) / 2
+        d = []
+        for yi, row in enumerate(mat):
+            xi = 0
+            while xi < len(row):
+                if row[xi]:
+                    run = xi
+                    while run < len(row) and row[run]:
+                        run += 1
+                    d.append(f"M{ox + xi * mod:.3f} {oy + yi * mod:.3f}"
+                             f"h{(run - xi) * mod:.3f}v{mod:.3f}h{-(run - xi) * mod:.3f}z")
+                    xi = run
+                else:
+                    xi += 1
+        parts.append(f'<path fill="#0b132b" d="{"".join(d)}"/>')
+        esc = (str(label)[:48].replace("&", "&amp;").replace("<", "&lt;")
+               .replace(">", "&gt;"))
+        parts.append(f'<text x="{col * cell_mm + cell_mm / 2:.2f}" '
+                     f'y="{r * (cell_mm + lab_h) + cell_mm + lab_h / 2:.2f}" '
+                     f'font-family="Helvetica,Arial,sans-serif" font-size="4" '
+                     f'font-weight="bold" text-anchor="middle">{esc}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+# ──────────────────────────────────────────────────────────────────
+#  Roster import  (streaming .txt / .csv / .xlsx → registrations)
+# ──────────────────────────────────────────────────────────────────
+ROSTER_FIELDS = ["name", "department", "batch", "roll_no", "category"]
+ROSTER_HEADER_GUESSES = {
+    "name":       ("name", "full name", "full_name", "student name", "naam"),
+    "department": ("department", "dept", "program", "programme", "discipline"),
+    "batch":      ("batch", "year", "session", "batch/year", "class"),
+    "roll_no":    ("roll no", "roll_no", "roll", "roll number", "rollno",
+                   "reg no", "registration no", "enrollment no", "seat no"),
+    "category":   ("category", "role", "type"),
+}
+
+def clean_name(name) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(name)).split())
+
+def name_key(name: str) -> str:
+    # Dedup key: "  ALI  khan" and "Ali Khan" are the same attendee
+    return clean_name(name).casefold()
+
+def roll_key(roll_no) -> str:
+    # "cs-001 " and "CS-001" are the same roll number
+    return "".join(str(roll_no or "").split()).casefold()
+
+def roster_kind(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return "xlsx" if ext in ("xlsx", "xlsm") else ext
+
+def _open_text(fileobj):
+    fileobj.seek(0)
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+
+def roster_headers(fileobj, filename: str) -> list:
+    """First row of a CSV / XLSX (empty for .txt) — used for column mapping."""
+    kind = roster_kind(filename)
+    if kind == "csv":
+        text = _open_text(fileobj)
+        try:
+            header = next(csv.reader(text), [])
+        finally:
+            text.detach()
+    elif kind == "xlsx":
+        fileobj.seek(0)
+        wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            header = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+    else:
+        header = []
+    fileobj.seek(0)
+    return ["" if h is None else str(h).strip() for h in header]
+
+def looks_like_header(headers: list) -> bool:
+    """True when any cell of row 1 is a known column name — otherwise row 1 is data."""
+    known = {g for gs in ROSTER_HEADER_GUESSES.values() for g in gs}
+    return any(h.strip().lower() in known for h in headers)
+
+def guess_roster_mapping(headers: list) -> dict:
+    """field → column index (or None), matched on common registrar header names."""
+    low = [h.strip().lower() for h in headers]
+    out = {}
+    for field in ROSTER_FIELDS:
+        out[field] = next((i for i, h in enumerate(low)
+                           if h in ROSTER_HEADER_GUESSES[field]), None)
+    if out["name"] is None and headers:
+        out["name"] = 0
+    return out
+
+def iter_roster_rows(fileobj, filename: str, mapping: dict = None,
+                     default_category: str = "Participant", has_header: bool = True):
+    """Yield one normalised dict per roster row without loading the whole file."""
+    kind = roster_kind(filename)
+    if kind == "txt":
+        text = _open_text(fileobj)
+        try:
+            for line in text:
+                nm = clean_name(line)
+                if nm:
+                    yield {"name": nm, "category": default_category}
+        finally:
+            text.detach()
+        return
+
+    mapping = mapping or {}
+    def _pick(row, field):
+        idx = mapping.get(field)
+        if idx is None or idx >= len(row) or row[idx] is None:
+            return ""
+        return clean_name(row[idx])
+
+    def _rows():
+        if kind == "csv":
+            text = _open_text(fileobj)
+            try:
+                reader = csv.reader(text)
+                if has_header:
+                    next(reader, None)
+                yield from reader
+            finally:
+                text.detach()
+        elif kind == "xlsx":
+            fileobj.seek(0)
+            wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+            try:
+                yield from wb.active.iter_rows(min_row=2 if has_header else 1, values_only=True)
+            finally:
+                wb.close()
+        else:
+            raise ValueError(f"Unsupported roster file: {filename}")
+
+    for row in _rows():
+        nm = _pick(row, "name")
+        if not nm:
+            continue
+        yield {
+            "name":       nm,
+            "department": _pick(row, "department"),
+            "batch":      _pick(row, "batch"),
+            "roll_no":    _pick(row, "roll_no"),
+            "category":   _pick(row, "category") or default_category,
+        }
+
+def import_roster(db: CertDB, event: str, fileobj, filename: str, mapping: dict = None,
+                  default_category: str = "Participant", chunk: int = 1000,
+                  on_progress=None, has_header: bool = None) -> tuple:
+    """Stream a roster into db in chunks; returns (rows read, rows added).
+
+    has_header=None decides from row 1 (looks_like_header), so a headerless
+    CSV / XLSX does not lose its first attendee.
+    """
+    if has_header is None:
+        has_header = looks_like_header(roster_headers(fileobj, filename))
+    total = added = 0
+    batch = []
+    with METRICS.time("roster.import"):
+        for row in iter_roster_rows(fileobj, filename, mapping, default_category, has_header):
+            batch.append(row)
+            total += 1
+            if len(batch) >= chunk:
+                added += db.register_many(event, batch)
+                batch = []
+                if on_progress:
+                    on_progress(total)
+        if batch:
+            added += db.register_many(event, batch)
+    METRICS.incr("roster_rows_total", total)
+    return total, added
+
+
+# ──────────────────────────────────────────────────────────────────
+#  Bulk helpers
+# ──────────────────────────────────────────────────────────────────
+def find_issued(issued: dict, category: str, name: str, roll_no: str) -> str:
+    """Look an attendee up in CertDB.issued_ids(); a name-only certificate still counts."""
+    nk = name_key(name)
+    return issued.get((category, nk, roll_key(roll_no))) or issued.get((category, nk, ""), "")
+
+def archive_path(category: str, name: str, roll_no: str, seen: set) -> str:
+    """{cat}/{name}.png, suffixed with the roll no (then a counter) when the name repeats."""
+    path = f"{category}/{name}.png"
+    if path.casefold() in seen:
+        base = f"{category}/{name} ({roll_no})" if roll_no else f"{category}/{name}"
+        path, n = f"{base}.png", 2
+        while path.casefold() in seen:
+            path, n = f"{base} ({n}).png", n + 1
+    # casefold: Windows/macOS unzip would overwrite "Ali Khan.png" with "ALI KHAN.png"
+    seen.add(path.casefold())
+    return path
+
+def write_bulk_zip(zf: zipfile.ZipFile, items: list, template_bytes: bytes,
+                   c: dict, event_name: str, on_progress=None,
+                   verify_base: str = None, db: CertDB = None) -> list:
+    """Render every roster row (CertDB.roster_rows) into zf as {cat}/{name}.png; returns log records.
+
+    With a db, every certificate gets a verification ID (embedded as a QR when
+    verify_base is set) and the IDs are written in batched transactions.
+    Attendees already in the event's log keep their ID and are not re-logged,
+    so running bulk again does not multiply the log or its totals.
+    """
+    records = []
+    pending = []
+    seen    = set()
+    issued  = db.issued_ids(event_name) if db else {}
+    for i, row in enumerate(items):
+        nm, cat = row["name"], row["category"]
+        roll_no = row.get("roll_no") or ""
+        if on_progress:
+            on_progress(i, nm, cat)
+        key     = (cat, name_key(nm), roll_key(roll_no))
+        cert_id = find_issued(issued, cat, nm, roll_no) or (new_cert_id() if db else None)
+        vurl    = verify_url_for(verify_base, cert_id) if (cert_id and verify_base) else None
+        with METRICS.time("bulk.item"):
+            png = generate_certificate(nm, template_bytes, c, cert_id, vurl)
+            with METRICS.time("zip.deflate"):
+                zf.writestr(archive_path(cat, nm, roll_no, seen), png)
+        now = datetime.now()
+        rec = {
+            "name":nm, "category":cat,
+            "department":row.get("department") or "",
+            "batch":row.get("batch") or "",
+            "roll_no":roll_no,
+            "event":event_name,
+            "date":now.strftime("%Y-%m-%d"),
+            "day":now.strftime("%A"),
+            "time":now.strftime("%H:%M:%S")
+        }
+        if cert_id:
+            rec["cert_id"] = cert_id
+        if cert_id and not find_issued(issued, cat, nm, roll_no):
+            issued[key] = cert_id
+            pending.append(rec)
+            if len(pending) >= 500:
+                db.issue_many(pending)
+                pending = []
+        records.append(rec)
+    if pending:
+        db.issue_many(pending)
+    METRICS.incr("bulk_items_total", len(items))
+    return records
@@ -0,0 +1,109 @@
+"""Sharded bulk runs: plan → run → merge is repeatable and never re-issues IDs."""
+
+import io
+import json
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("qrcode")
+pytest.importorskip("reportlab")
+pytest.importorskip("openpyxl")
+
+from PIL import Image
+
+import bulk_shards as bs
+from cert_core import CertDB
+
+CFG = {"text_x": 50, "text_y": 60, "font_size": 24,
+       "text_color": "#1a1a1a", "font_style": "Bold"}
+
+
+def _template() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 220), (250, 246, 232)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = CertDB(str(tmp_path / "certgen.db"))
+    db.register_many("Expo", [
+        {"name": "Muhammad Ali", "category": "Participant", "roll_no": "CS-1"},
+        {"name": "Muhammad Ali", "category": "Participant", "roll_no": "CS-2"},
+        {"name": "Ayesha Khan",  "category": "Participant", "roll_no": "CS-3"},
+        {"name": "Bilal Rind",   "category": "Speaker"},
+        {"name": "Fatima",       "category": "Teacher"},
+    ])
+    return db
+
+
+def _cycle(job_dir, db, tpl):
+    job = bs.plan_job(job_dir, {"event_name": "Expo"}, db.roster_rows("Expo"),
+                      tpl, CFG, shards=2, db=db)
+    for s in job["shards"]:
+        if not bs.shard_done(job_dir, job, s["shard"]):
+            bs.run_shard(job_dir, s["shard"])
+    return job, bs.merge_job(job_dir, db=db)
+
+
+def test_replan_and_remerge_issue_once(tmp_path, db):
+    job_dir, tpl = str(tmp_path / "job"), _template()
+    job1, res1 = _cycle(job_dir, db, tpl)
+    assert res1["verify"]["ok"]
+    assert db.count() == 5
+
+    job2, res2 = _cycle(job_dir, db, tpl)
+    assert job2["job_id"] == job1["job_id"]
+    assert job2.get("issued")
+    assert res2["verify"]["ok"]
+    assert db.count() == 5
+    assert db.log_stats("Expo")["total"] == 5
+
+    with zipfile.ZipFile(res2["zip"]) as zf:
+        names = sorted(zf.namelist())
+    assert len(names) == 5
+    assert "Participant/Muhammad Ali.png" in names
+    assert "Participant/Muhammad Ali (CS-2).png" in names
+
+
+def test_stale_lock_is_taken_over_and_reported(tmp_path, db):
+    job_dir = str(tmp_path / "job")
+    bs.plan_job(job_dir, {"event_name": "Expo"}, db.roster_rows("Expo"),
+                _template(), CFG, shards=2, db=db)
+    # A worker on this host that died mid-shard
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    with open(bs._shard_path(job_dir, 0, "lock"), "w", encoding="utf-8") as f:
+        json.dump({"host": bs.HOST, "pid": dead.pid, "time": 0}, f)
+
+    report = bs.verify_job(job_dir)
+    assert report["missing_shards"] == [0, 1]
+    assert [(l["shard"], l["stale"]) for l in report["locked_shards"]] == [(0, True)]
+
+    assert sorted(bs.run_claimed(job_dir)) == [0, 1]
+    assert bs.verify_job(job_dir)["ok"]
+
+
+@pytest.mark.parametrize("by", bs.SHARD_BY)
+def test_split_covers_every_attendee_once(by):
+    roster = [{"name": str(i), "category": "ABC"[i % 3]} for i in range(23)]
+    for n in (1, 3, 4, 50):
+        parts = bs.split_shards(roster, n, by)
+        assert sorted(i for p in parts for i in p) == list(range(23))
+
+
+def test_replan_refreshes_event_info_and_dirs_do_not_collide(tmp_path, db):
+    job_dir, tpl = str(tmp_path / "job"), _template()
+    job1 = bs.plan_job(job_dir, {"event_name": "Expo", "venue": "Hall A"},
+                       db.roster_rows("Expo"), tpl, CFG, shards=2, db=db)
+    job2 = bs.plan_job(job_dir, {"event_name": "Expo", "venue": "Hall B"},
+                       db.roster_rows("Expo"), tpl, CFG, shards=2, db=db)
+    assert job2["job_id"] == job1["job_id"]
+    assert bs.load_job(job_dir)[0]["event_info"]["venue"] == "Hall B"
+
+    root = str(tmp_path)
+    assert bs.job_dir_for(root, "AI Workshop") != bs.job_dir_for(root, "AI_Workshop")
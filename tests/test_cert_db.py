@@ -0,0 +1,84 @@
+"""Registration dedup: roll numbers split namesakes, name-only rows merge into them."""
+
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("qrcode")
+pytest.importorskip("reportlab")
+pytest.importorskip("openpyxl")
+
+from cert_core import CertDB, guess_roster_mapping, import_roster, roster_headers, write_bulk_zip
+
+CFG = {"text_x": 50, "text_y": 60, "font_size": 24,
+       "text_color": "#1a1a1a", "font_style": "Bold"}
+
+
+def _template() -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 220), (250, 246, 232)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return CertDB(str(tmp_path / "certgen.db"))
+
+
+def test_namesakes_with_different_roll_numbers_are_kept(db):
+    assert db.register_many("Expo", [
+        {"name": "Muhammad Ali", "category": "Participant", "roll_no": "CS-1"},
+        {"name": "Muhammad Ali", "category": "Participant", "roll_no": "CS-2"},
+        {"name": "muhammad  ali", "category": "Participant", "roll_no": "cs-1"},
+    ]) == 2
+
+
+def test_name_only_row_takes_the_roll_number_instead_of_duplicating(db):
+    # .txt roster first, then the student scans the QR and types a roll no
+    assert db.register_many("Expo", [{"name": "Ali Khan", "category": "Participant"}]) == 1
+    db.register("Expo", "Participant", "Ali Khan", department="CS", roll_no="CS-1")
+    # ...and a later .txt upload of the same name is still a duplicate
+    assert db.register_many("Expo", [{"name": "ali khan", "category": "Participant"}]) == 0
+
+    rows = db.roster_rows("Expo")
+    assert len(rows) == 1
+    assert (rows[0]["roll_no"], rows[0]["department"]) == ("CS-1", "CS")
+
+
+def test_bulk_reuses_a_name_only_certificate_once_roll_is_known(db):
+    tpl = _template()
+    db.register_many("Expo", [{"name": "Ali Khan", "category": "Participant"}])
+    with zipfile.ZipFile(io.BytesIO(), "w") as zf:
+        first = write_bulk_zip(zf, db.roster_rows("Expo"), tpl, CFG, "Expo", db=db)
+    db.register("Expo", "Participant", "Ali Khan", roll_no="CS-1")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        second = write_bulk_zip(zf, db.roster_rows("Expo"), tpl, CFG, "Expo", db=db)
+
+    assert second[0]["cert_id"] == first[0]["cert_id"]
+    assert db.count() == 1
+    with zipfile.ZipFile(buf) as zf:
+        assert zf.namelist() == ["Participant/Ali Khan.png"]
+
+
+def test_bulk_log_carries_department_and_batch(db):
+    db.register_many("Expo", [{"name": "Sara", "category": "Participant",
+                               "department": "EE", "batch": "2021", "roll_no": "EE-7"}])
+    with zipfile.ZipFile(io.BytesIO(), "w") as zf:
+        write_bulk_zip(zf, db.roster_rows("Expo"), _template(), CFG, "Expo", db=db)
+    (rec,) = db.iter_log("Expo")
+    assert (rec["department"], rec["batch"], rec["roll_no"]) == ("EE", "2021", "EE-7")
+
+
+@pytest.mark.parametrize("data, names", [
+    (b"Ali,CS\nBo,EE\n", ["Ali", "Bo"]),
+    (b"Full Name,Department\nAli,CS\n", ["Ali"]),
+])
+def test_csv_first_row_is_data_unless_it_looks_like_a_header(db, data, names):
+    f = io.BytesIO(data)
+    mapping = guess_roster_mapping(roster_headers(f, "roster.csv"))
+    import_roster(db, "Expo", f, "roster.csv", mapping)
+    assert [r["name"] for r in db.roster_rows("Expo")] == names